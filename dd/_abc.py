@@ -564,6 +564,8 @@ def reorder(
 class Operator(_ty.Protocol):
     """Convenience wrapper for edges returned by `BDD`."""
 
+    __slots__ = ()
+
     def __init__(
             self,
             node,
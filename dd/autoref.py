@@ -641,6 +641,40 @@ def preimage(
     return trans.bdd._wrap(u)
 
 
+def and_exists(
+        u:
+            _Ref,
+        v:
+            _Ref,
+        qvars:
+            set[_VariableName]
+        ) -> _Ref:
+    r"""Return `\E qvars:  u /\ v`."""
+    if u.bdd is not v.bdd:
+        raise ValueError(
+            (u.bdd, v.bdd))
+    r = _bdd.and_exists(
+        u.node, v.node, qvars, u.manager)
+    return u.bdd._wrap(r)
+
+
+def or_forall(
+        u:
+            _Ref,
+        v:
+            _Ref,
+        qvars:
+            set[_VariableName]
+        ) -> _Ref:
+    r"""Return `\A qvars:  u \/ v`."""
+    if u.bdd is not v.bdd:
+        raise ValueError(
+            (u.bdd, v.bdd))
+    r = _bdd.or_forall(
+        u.node, v.node, qvars, u.manager)
+    return u.bdd._wrap(r)
+
+
 def reorder(
         bdd:
             BDD,
@@ -702,6 +736,12 @@ class Function(dd._abc.Operator):
     The design here is inspired by the PyEDA package.
     """
 
+    __slots__ = (
+        'bdd',
+        'manager',
+        'node',
+        '__weakref__')
+
     def __init__(
             self,
             node:
@@ -837,10 +877,13 @@ class Function(dd._abc.Operator):
         # unary op ?
         if other is None:
             u = self.manager.apply(op, self.node)
-        else:
-            if self.bdd is not other.bdd:
-                raise ValueError((self.bdd, other.bdd))
-            u = self.manager.apply(op, self.node, other.node)
+            return Function(u, self.bdd)
+        if self.bdd is not other.bdd:
+            raise ValueError((self.bdd, other.bdd))
+        # the nodes of `Function`s are referenced,
+        # so they are in `self.manager`
+        binary = _bdd._BINARY_OPERATORS[op]
+        u = binary(self.manager, self.node, other.node)
         return Function(u, self.bdd)
 
     @property
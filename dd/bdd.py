@@ -40,9 +40,12 @@ Henrik R. Andersen
 # Copyright 2014 by California Institute of Technology
 # All rights reserved. Licensed under BSD-3.
 #
+import collections as _cl
 import collections.abc as _abc
 import functools as _ft
+import heapq as _hp
 import inspect
+import itertools as _itr
 import logging
 import pickle
 import pprint as _pp
@@ -58,7 +61,14 @@ import dd._utils as _utils
 logger = logging.getLogger(__name__)
 REORDER_STARTS = 100
 REORDER_FACTOR = 2
+SIFTING_MAX_GROWTH = 1.2
+    # sifting a variable in a direction stops
+    # when the manager exceeds this factor of
+    # its size before sifting the variable
 GROWTH_FACTOR = 2
+MAX_CACHE_HARD = 2**18
+_MAX_CANON_TABLE = 2**10
+_MAX_MEMO_TABLES = 2**6
 
 
 def _request_reordering(
@@ -224,19 +234,47 @@ class BDD(dd._abc.BDD[_Ref]):
         # as node indices
         self._min_free: _Nat = 2
             # minimum number unused as BDD index
+        self._free_nodes: list[_Node] = list()
+            # heap of indices freed by
+            # garbage collection, some of
+            # which may have been reused
         self._ite_table: dict[
-            tuple[_Ref, _Ref, _Ref],
-            _Ref
+            _Nat,
+            tuple[
+                tuple[_Ref, _Ref, _Ref],
+                _Ref]
             ] = dict()
-            # `(predicate, then, else) |-> edge`
-            # cache for ternary conditional
-            # ("ite" means "if-then-else")
+            # `slot |-> ((predicate, then, else), edge)`
+            # direct-mapped cache for
+            # ternary conditional
+            # ("ite" means "if-then-else"),
+            # a new entry overwrites the entry
+            # that occupies the same slot
+        self._ite_table_mask: _Nat = MAX_CACHE_HARD - 1
+            # number of cache slots minus 1,
+            # the number of slots is a power of 2
         self.vars: _VariableLevels = dict()
         self._level_to_var: dict[
             _Level,
             _VariableName
             ] = dict()
             # inverse of `self.vars`
+        self._canon_table: dict[
+            tuple,
+            tuple
+            ] = dict()
+            # memoizes `self._canon_levels()`
+            # and `self._canon_rename()`,
+            # cleared when levels change
+        self._memo_tables: dict[
+            tuple,
+            dict
+            ] = dict()
+            # `operation |-> memo`,
+            # memos that persist across calls of
+            # `image`, `preimage`, `and_exists`, `rename`,
+            # cleared when nodes are removed,
+            # or levels change
         # handle no vars
         self._init_terminal(len(self.vars))
         # for decorator nesting
@@ -258,8 +296,10 @@ class BDD(dd._abc.BDD[_Ref]):
         bdd._succ = dict(self._succ)
         bdd._ref = dict(self._ref)
         bdd._min_free = self._min_free
+        bdd._free_nodes = list(self._free_nodes)
         bdd.roots = set(self.roots)
         bdd.max_nodes = self.max_nodes
+        bdd._ite_table_mask = self._ite_table_mask
         return bdd
 
     def __del__(
@@ -325,9 +365,13 @@ class BDD(dd._abc.BDD[_Ref]):
 
         - `'reordering'`:
           if `True` then enable, else disable
+        - `'max_cache_hard'`:
+          number of entries in the cache of `ite`,
+          rounded up to a power of 2
         """
         d = dict(
-            reordering=(self._last_len is not None))
+            reordering=(self._last_len is not None),
+            max_cache_hard=self._ite_table_mask + 1)
         for k, v in kw.items():
             if k == 'reordering':
                 if v:
@@ -335,6 +379,14 @@ class BDD(dd._abc.BDD[_Ref]):
                         REORDER_STARTS, len(self))
                 else:
                     self._last_len = None
+            elif k == 'max_cache_hard':
+                if v < 1:
+                    raise ValueError(
+                        f'`max_cache_hard` is {v}, '
+                        'expected integer >= 1')
+                size = 1 << (v - 1).bit_length()
+                self._ite_table_mask = size - 1
+                self._ite_table = dict()
             else:
                 raise ValueError(
                     f'Unknown parameter "{k}"')
@@ -390,8 +442,9 @@ class BDD(dd._abc.BDD[_Ref]):
 
         with 0 as minimum value.
         """
-        if self._ref[abs(u)] <= 0:
-            n = self._ref[abs(u)]
+        r = abs(u)
+        n = self._ref[r]
+        if n <= 0:
             warnings.warn(
                 'The method `dd.bdd.BDD.decref` was called '
                 f'for BDD node {u} with reference count {n}. '
@@ -400,7 +453,7 @@ class BDD(dd._abc.BDD[_Ref]):
                 'may indicate a programming error.',
                 UserWarning)
             return
-        self._ref[abs(u)] -= 1
+        self._ref[r] = n - 1
 
     def ref(
             self,
@@ -466,6 +519,10 @@ class BDD(dd._abc.BDD[_Ref]):
         # move the leaf node to
         # the new bottom level
         self._init_terminal(len(self.vars))
+        # memoized conversions can contain
+        # names that were undeclared until now
+        self._canon_table = dict()
+        self._memo_tables = dict()
         return level
 
     def _check_var(
@@ -681,6 +738,114 @@ class BDD(dd._abc.BDD[_Ref]):
                 self.vars[k]
                 for k in d}
 
+    def _canon_levels(
+            self,
+            d:
+                _Assignment |
+                _abc.Iterable[_VariableName] |
+                _abc.Iterable[_Level]
+            ) -> tuple[
+                dict[_Level, bool] |
+                set[_Level],
+                list[_Level]]:
+        """Return `d` mapped to levels, and sorted levels.
+
+        Memoizes the result of `self._map_to_level()`,
+        so that repeated calls with the same
+        variables (as in a fixpoint computation)
+        do not rebuild the same containers.
+        The returned containers are shared,
+        and should not be modified.
+        """
+        if isinstance(d, _abc.Mapping):
+            key = (True, frozenset(d.items()))
+        else:
+            d = frozenset(d)
+            key = (False, d)
+        r = self._canon_table.get(key)
+        if r is not None:
+            return r
+        levels = self._map_to_level(d)
+        r = (levels, sorted(levels))
+        if len(self._canon_table) >= _MAX_CANON_TABLE:
+            self._canon_table = dict()
+        self._canon_table[key] = r
+        return r
+
+    def _canon_rename(
+            self,
+            rename:
+                _Renaming |
+                dict[_Level, _Level],
+            total:
+                _Yes=False
+            ) -> tuple[
+                dict[_Level, _Level],
+                frozenset]:
+        """Return `rename` mapped to levels, and as `frozenset`.
+
+        Memoized as `self._canon_levels()`.
+        The returned `dict` is shared,
+        and should not be modified.
+
+        @param rename:
+            maps variable names or levels
+            to variable names or levels
+        @param total:
+            if `True`, then map each
+            variable name in `self.vars`,
+            to itself if not in `rename`
+        """
+        key = ('rename', total, frozenset(rename.items()))
+        r = self._canon_table.get(key)
+        if r is not None:
+            return r
+        levels = self.vars
+        if total:
+            d = {
+                levels[var]: levels[rename.get(var, var)]
+                for var in levels}
+        else:
+            d = {
+                levels.get(k, k): levels.get(v, v)
+                for k, v in rename.items()}
+        r = (d, frozenset(d.items()))
+        if len(self._canon_table) >= _MAX_CANON_TABLE:
+            self._canon_table = dict()
+        self._canon_table[key] = r
+        return r
+
+    def _memo_table(
+            self,
+            key:
+                tuple
+            ) -> dict:
+        """Return memo for the operation `key`.
+
+        The memo persists across calls,
+        so repeated calls of the same operation
+        (as in a fixpoint computation)
+        reuse previous results.
+        A memo larger than the `ite` cache
+        is replaced by an empty one.
+        When there are too many memos,
+        or too many entries in all memos
+        (more than the size of the `ite` cache),
+        the least recently used memos are removed.
+        """
+        # `memos` is ordered by last use
+        memos = self._memo_tables
+        memo = memos.pop(key, None)
+        if memo is None or len(memo) > self._ite_table_mask:
+            memo = dict()
+        total = len(memo) + sum(map(len, memos.values()))
+        while memos and (
+                len(memos) >= _MAX_MEMO_TABLES or
+                total > self._ite_table_mask):
+            total -= len(memos.pop(next(iter(memos))))
+        memos[key] = memo
+        return memo
+
     def _assert_keys_are_levels(
             self,
             kv:
@@ -719,10 +884,16 @@ class BDD(dd._abc.BDD[_Ref]):
             *nodes:
                 _Ref
             ) -> _Level:
-        def level_of(node):
-            level, *_ = self._succ[abs(node)]
-            return level
-        return min(map(level_of, nodes))
+        succ = self._succ
+        top = None
+        for node in nodes:
+            level, _, _ = succ[abs(node)]
+            if top is None or level < top:
+                top = level
+        if top is None:
+            raise ValueError(
+                'expected at least one node')
+        return top
 
     def copy(
             self,
@@ -746,34 +917,27 @@ class BDD(dd._abc.BDD[_Ref]):
         Nodes are represented as positive integers.
         """
         abs_roots = set(map(abs, roots))
-        visited = set()
-        for u in abs_roots:
-            visited.add(1)
-            self._descendants(u, visited)
-        if not abs_roots.issubset(visited):
-            raise AssertionError(
-                (abs_roots, visited))
+        if not abs_roots:
+            return set()
+        # depth-first search with an explicit stack,
+        # which reads each triple from `_succ` once
+        succ = self._succ
+        visited = {1}
+        stack = list(abs_roots)
+        while stack:
+            u = stack.pop()
+            if u in visited:
+                continue
+            visited.add(u)
+            _, v, w = succ[u]
+            if not v:
+                raise AssertionError(v)
+            if not w:
+                raise AssertionError(w)
+            stack.append(abs(v))
+            stack.append(w)
         return visited
 
-    def _descendants(
-            self,
-            u:
-                _Ref,
-            visited:
-                set[_Node]
-            ) -> None:
-        r = abs(u)
-        if r == 1 or r in visited:
-            return
-        _, v, w = self._succ[r]
-        if not v:
-            raise AssertionError(v)
-        if not w:
-            raise AssertionError(w)
-        self._descendants(v, visited)
-        self._descendants(w, visited)
-        visited.add(r)
-
     def is_essential(
             self,
             u:
@@ -789,21 +953,34 @@ class BDD(dd._abc.BDD[_Ref]):
         i = self.vars.get(var)
         if i is None:
             return False
-        iu, v, w = self._succ[abs(u)]
-        # var above node u ?
-        if i < iu:
-            return False
-        if i == iu:
-            return True
-        # u depends on node labeled with var ?
-        if not v:
-            raise AssertionError(v)
-        if not w:
-            raise AssertionError(w)
-        if self.is_essential(v, var):
-            return True
-        if self.is_essential(w, var):
-            return True
+        # support memoized ?
+        memo = self._memo_tables.get(('support',))
+        if memo is not None and abs(u) in memo:
+            return i in memo[abs(u)]
+        # depth-first search,
+        # each node visited at most once
+        succ = self._succ
+        stack = [abs(u)]
+        visited = set()
+        while stack:
+            r = stack.pop()
+            if r in visited:
+                continue
+            visited.add(r)
+            ir, v, w = succ[r]
+            # var above node r ?
+            # (this case includes the terminal node)
+            if i < ir:
+                continue
+            if i == ir:
+                return True
+            # r depends on node labeled with var ?
+            if not v:
+                raise AssertionError(v)
+            if not w:
+                raise AssertionError(w)
+            stack.append(abs(v))
+            stack.append(w)
         return False
 
     def support(
@@ -814,43 +991,50 @@ class BDD(dd._abc.BDD[_Ref]):
                 _Yes=False
             ) -> set[
                 _VariableName]:
-        levels = set()
-        nodes = set()
-        self._support(u, levels, nodes)
+        # memoized ?
+        memo = self._memo_table(('support',))
+        levels = memo.get(abs(u))
+        if levels is not None:
+            levels = set(levels)
+        else:
+            levels = self._support_levels(u)
+            memo[abs(u)] = frozenset(levels)
         if as_levels:
             return levels
-        return {self.var_at_level(i) for i in levels}
+        level_to_var = self._level_to_var
+        return {level_to_var[i] for i in levels}
 
-    def _support(
+    def _support_levels(
             self,
             u:
-                _Ref,
-            levels:
-                set[_Level],
-            nodes:
-                set[_Ref]):
-        """Recurse to collect variables in support."""
-        # exhausted all vars ?
-        if len(levels) == len(self.vars):
-            return
-        # visited ?
-        r = abs(u)
-        if r in nodes:
-            return
-        nodes.add(r)
-        # terminal ?
-        if r == 1:
-            return
-        # add var
-        i, v, w = self._succ[r]
-        if not v:
-            raise AssertionError(v)
-        if not w:
-            raise AssertionError(w)
-        levels.add(i)
-        # recurse
-        self._support(v, levels, nodes)
-        self._support(w, levels, nodes)
+                _Ref
+            ) -> set[_Level]:
+        """Return levels of the support of `u`."""
+        # depth-first search with an explicit stack,
+        # which stops when all variables are found
+        succ = self._succ
+        n = len(self.vars)
+        levels = set()
+        nodes = {1}
+        stack = [abs(u)]
+        while stack:
+            r = stack.pop()
+            if r in nodes:
+                continue
+            nodes.add(r)
+            i, v, w = succ[r]
+            if not v:
+                raise AssertionError(v)
+            if not w:
+                raise AssertionError(w)
+            if i not in levels:
+                levels.add(i)
+                # all variables found ?
+                if len(levels) == n:
+                    break
+            stack.append(abs(v))
+            stack.append(w)
+        return levels
 
     def levels(
             self,
@@ -870,15 +1054,16 @@ class BDD(dd._abc.BDD[_Ref]):
             if `True`, then omit
             terminal nodes.
         """
+        # bucket nodes by level in one pass,
+        # instead of one pass per level
+        n = len(self.vars)
+        buckets = [list() for _ in range(n + 1)]
+        for u, (i, v, w) in self._succ.items():
+            buckets[i].append((u, i, v, w))
         if skip_terminals:
-            n = len(self.vars) - 1
-        else:
-            n = len(self.vars)
-        for i in range(n, -1, -1):
-            for u, (j, v, w) in self._succ.items():
-                if i != j:
-                    continue
-                yield u, i, v, w
+            buckets.pop()
+        for bucket in reversed(buckets):
+            yield from bucket
 
     def _levels(
             self
@@ -907,19 +1092,27 @@ class BDD(dd._abc.BDD[_Ref]):
         # terminals
         bdd = BDD(self.vars)
         umap = {1: 1}
-        # non-terminals
+        # non-terminals, grouped by level
+        batches = list()
         levels = self.levels(
             skip_terminals=True)
         for u, i, v, w in levels:
             if u <= 0:
                 raise AssertionError(u)
-            p, q = umap[abs(v)], umap[abs(w)]
-            p = _flip(p, v)
-            q = _flip(q, w)
-            r = bdd.find_or_add(i, p, q)
-            if r <= 0:
-                raise AssertionError(r)
-            umap[u] = r
+            if not batches or batches[-1][0] != i:
+                batches.append((i, list()))
+            batches[-1][1].append((u, v, w))
+        # a level depends only on the levels below
+        for i, batch in batches:
+            pairs = [
+                (_flip(umap[abs(v)], v),
+                 _flip(umap[abs(w)], w))
+                for _, v, w in batch]
+            nodes = bdd._find_or_add_many(i, pairs)
+            for (u, _, _), r in zip(batch, nodes):
+                if r <= 0:
+                    raise AssertionError(r)
+                umap[u] = r
         for v in self.roots:
             p = umap[abs(v)]
             p = _flip(p, v)
@@ -1000,8 +1193,10 @@ class BDD(dd._abc.BDD[_Ref]):
             v: k
             for k, v in
                 self._succ.items()}
-        # clear cache
+        # clear caches
         self._ite_table = dict()
+        self._canon_table = dict()
+        self._memo_tables = dict()
         return rm_vars
 
     def let(
@@ -1080,43 +1275,62 @@ class BDD(dd._abc.BDD[_Ref]):
                     tuple[_Ref, _Ref],
                     _Ref]
             ) -> _Ref:
-        # terminal ?
-        if abs(f) == 1:
-            return f
-        # cached ?
-        if (f, g) in cache:
-            return cache[(f, g)]
-        # independent of j ?
-        i, v, w = self._succ[abs(f)]
-        if not v:
-            raise AssertionError(v)
-        if not w:
-            raise AssertionError(w)
-        # below j ?
-        if j < i:
-            return f
-        elif i == j:
-            r = self.ite(g, w, v)
-            # complemented edge ?
-            if f < 0:
-                r = -r
-        else:
-            if i >= j:
-                raise AssertionError(
-                    (i, j))
-            k, _, _ = self._succ[abs(g)]
-            z = min(i, k)
-            f0, f1 = self._top_cofactor(f, z)
-            g0, g1 = self._top_cofactor(g, z)
-            p = self._compose(
-                f0, j, g0,
-                cache)
-            q = self._compose(
-                f1, j, g1,
-                cache)
-            r = self.find_or_add(z, p, q)
-        cache[(f, g)] = r
-        return r
+        """Substitute `g` for level `j` in `f`, by iteration.
+
+        Pairs `(f, g)` are memoized in `cache`.
+        """
+        succ = self._succ
+        top_cofactor = self._top_cofactor
+        root = (f, g)
+        stack = [root]
+        while stack:
+            t = stack[-1]
+            if t in cache:
+                stack.pop()
+                continue
+            f, g = t
+            # terminal ?
+            if abs(f) == 1:
+                cache[t] = f
+                stack.pop()
+                continue
+            # independent of j ?
+            i, v, w = succ[abs(f)]
+            if not v:
+                raise AssertionError(v)
+            if not w:
+                raise AssertionError(w)
+            # below j ?
+            if j < i:
+                r = f
+            elif i == j:
+                r = self.ite(g, w, v)
+                # complemented edge ?
+                if f < 0:
+                    r = -r
+            else:
+                k, _, _ = succ[abs(g)]
+                z = i if i < k else k
+                f0, f1 = top_cofactor(f, z)
+                g0, g1 = top_cofactor(g, z)
+                t0 = (f0, g0)
+                t1 = (f1, g1)
+                # children pending ?
+                pending = False
+                if t1 not in cache:
+                    stack.append(t1)
+                    pending = True
+                if t0 not in cache:
+                    stack.append(t0)
+                    pending = True
+                if pending:
+                    continue
+                p = cache[t0]
+                q = cache[t1]
+                r = self.find_or_add(z, p, q)
+            cache[t] = r
+            stack.pop()
+        return cache[root]
 
     def _vector_compose(
             self,
@@ -1127,37 +1341,47 @@ class BDD(dd._abc.BDD[_Ref]):
             cache:
                 dict[_Node, _Ref]
             ) -> _Ref:
-        # terminal ?
-        if abs(f) == 1:
-            return f
-        # cached ?
-        r = cache.get(abs(f))
-        if r is not None:
-            if r == 0:
-                raise AssertionError(r)
-            # complement ?
-            if f < 0:
-                r = -r
-            return r
-        # recurse
-        i, v, w = self._succ[abs(f)]
-        if not v:
-            raise AssertionError(v)
-        if not w:
-            raise AssertionError(w)
-        p = self._vector_compose(
-            v, level_sub,
-            cache)
-        q = self._vector_compose(
-            w, level_sub,
-            cache)
-        # map this level
-        g = level_sub.get(i)
-        if g is None:
-            g = self.find_or_add(i, -1, 1)
-        r = self.ite(g, q, p)
-        # memoize
-        cache[abs(f)] = r
+        """Substitute `level_sub` in `f`, by iteration.
+
+        Nodes are memoized in `cache`
+        by their regular edge.
+        """
+        succ = self._succ
+        ite = self.ite
+        cache.setdefault(1, 1)
+        stack = [abs(f)]
+        while stack:
+            x = stack[-1]
+            if x in cache:
+                stack.pop()
+                continue
+            i, v, w = succ[x]
+            if not v:
+                raise AssertionError(v)
+            if not w:
+                raise AssertionError(w)
+            # children pending ?
+            pending = False
+            if w not in cache:
+                stack.append(w)
+                pending = True
+            if abs(v) not in cache:
+                stack.append(abs(v))
+                pending = True
+            if pending:
+                continue
+            p = cache[abs(v)]
+            q = cache[w]
+            if v < 0:
+                p = -p
+            # map this level
+            g = level_sub.get(i)
+            if g is None:
+                g = self.find_or_add(i, -1, 1)
+            # memoize
+            cache[x] = ite(g, q, p)
+            stack.pop()
+        r = cache[abs(f)]
         # complement ?
         if f < 0:
             r = -r
@@ -1189,11 +1413,13 @@ class BDD(dd._abc.BDD[_Ref]):
                 _Ref,
                 _Ref]:
         """Return successor pair with respect to level `i`."""
+        # strip the complement once
+        r = abs(u)
         # terminal node ?
-        if abs(u) == 1:
+        if r == 1:
             return (u, u)
         # non-terminal node
-        iu, v, w = self._succ[abs(u)]
+        iu, v, w = self._succ[r]
         if not v:
             raise AssertionError(v)
         if not w:
@@ -1208,7 +1434,7 @@ class BDD(dd._abc.BDD[_Ref]):
         # u labeled with var
         # complement ?
         if u < 0:
-            v, w = -v, -w
+            return (-v, -w)
         return (v, w)
 
     @_try_to_reorder
@@ -1220,76 +1446,96 @@ class BDD(dd._abc.BDD[_Ref]):
                 _Assignment
             ) -> _Ref:
         """Replace variables in `u` with Booleans."""
-        level_values = self._map_to_level(values)
-        cache = dict()
-        ordvar = sorted(level_values)
-        j = 0
+        level_values, ordvar = self._canon_levels(values)
         if abs(u) not in self:
             raise ValueError(
                 f'node {u} not in `self`')
+        # descend while the level is assigned,
+        # so that evaluation at an assignment
+        # to all variables in the support
+        # needs neither recursion nor memoization
+        succ = self._succ
+        while abs(u) != 1:
+            i, v, w = succ[abs(u)]
+            if i not in level_values:
+                break
+            r = w if level_values[i] else v
+            u = -r if u < 0 else r
+        if abs(u) == 1:
+            return u
+        key = (
+            'cofactor',
+            frozenset(level_values.items()))
+        cache = self._memo_table(key)
         return self._cofactor(
-            u, j, ordvar, level_values, cache)
+            u, ordvar, level_values, cache)
 
     def _cofactor(
             self,
             u:
                 _Ref,
-            j:
-                _Level,
             ordvar:
                 list[_Level],
             values:
                 dict[_Level, bool],
             cache:
-                dict[_Ref, _Ref]
+                dict[_Node, _Ref]
             ) -> _Ref:
-        """Recurse to compute cofactor."""
-        # terminal ?
-        if abs(u) == 1:
-            return u
-        # memoized ?
-        if u in cache:
-            return cache[u]
-        i, v, w = self._succ[abs(u)]
-        if not v:
-            raise AssertionError(v)
-        if not w:
-            raise AssertionError(w)
-        n = len(ordvar)
-        # skip nonessential variables
-        while j < n:
-            if ordvar[j] < i:
-                j += 1
+        """Return cofactor of `u`, by iteration.
+
+        Nodes are memoized in `cache`
+        by their regular edge,
+        and below the last assigned level
+        a node is its own cofactor.
+        """
+        succ = self._succ
+        find_or_add = self.find_or_add
+        bottom = ordvar[-1] if ordvar else -1
+        cache.setdefault(1, 1)
+        stack = [abs(u)]
+        while stack:
+            x = stack[-1]
+            if x in cache:
+                stack.pop()
+                continue
+            i, v, w = succ[x]
+            # exhausted valuation ?
+            if i > bottom:
+                cache[x] = x
+                stack.pop()
+                continue
+            if i in values:
+                c = w if values[i] else v
+                if abs(c) not in cache:
+                    stack.append(abs(c))
+                    continue
+                r = cache[abs(c)]
+                if c < 0:
+                    r = -r
             else:
-                break
-        if j == n:
-            # exhausted valuation
-            return u
-        if j >= n:
-            raise AssertionError((j, n))
-        # recurse
-        if i in values:
-            val = values[i]
-            if bool(val):
-                v = w
-            r = self._cofactor(
-                v, j,
-                ordvar, values,
-                cache)
-        else:
-            p = self._cofactor(
-                v, j,
-                ordvar, values,
-                cache)
-            q = self._cofactor(
-                w, j,
-                ordvar, values,
-                cache)
-            r = self.find_or_add(i, p, q)
+                # children pending ?
+                pending = False
+                if abs(w) not in cache:
+                    stack.append(abs(w))
+                    pending = True
+                if abs(v) not in cache:
+                    stack.append(abs(v))
+                    pending = True
+                if pending:
+                    continue
+                p = cache[abs(v)]
+                q = cache[abs(w)]
+                if v < 0:
+                    p = -p
+                if w < 0:
+                    q = -q
+                r = find_or_add(i, p, q)
+            cache[x] = r
+            stack.pop()
+        r = cache[abs(u)]
         # complement ?
         if u < 0:
             r = -r
-        cache[u] = r
         return r
 
     @_try_to_reorder
@@ -1314,21 +1560,17 @@ class BDD(dd._abc.BDD[_Ref]):
             then quantify `qvars` universally,
             else existentially.
         """
-        qvars = self._map_to_level(set(qvars))
-        cache = dict()
-        ordvar = sorted(qvars)
-        j = 0
+        qvars, ordvar = self._canon_levels(qvars)
+        key = ('quantify', frozenset(qvars), bool(forall))
+        cache = self._memo_table(key)
         return self._quantify(
-            u, j, ordvar,
-            qvars, forall,
-            cache)
+            u, ordvar, qvars,
+            forall, cache)
 
     def _quantify(
             self,
             u:
                 _Ref,
-            j:
-                _Level,
             ordvar:
                 list[_Level],
             qvars:
@@ -1338,50 +1580,63 @@ class BDD(dd._abc.BDD[_Ref]):
             cache:
                 dict[_Ref, _Ref]
             ) -> _Ref:
-        """Recurse to quantify variables."""
-        # terminal ?
-        if abs(u) == 1:
-            return u
-        if u in cache:
-            return cache[u]
-        i, v, w = self._succ[abs(u)]
-        if not v:
-            raise AssertionError(v)
-        if not w:
-            raise AssertionError(w)
-        # complement ?
-        if u < 0:
-            v, w = -v, -w
-        n = len(ordvar)
-        # skip nonessential variables
-        while j < n:
-            if ordvar[j] < i:
-                j += 1
-            else:
-                break
-        else:
-            # exhausted valuation
-            return u
-        # recurse
-        p = self._quantify(
-            v, j, ordvar,
-            qvars, forall,
-            cache)
-        q = self._quantify(
-            w, j, ordvar,
-            qvars, forall,
-            cache)
-        if i in qvars:
-            if forall:
-                r = self.ite(p, q, -1)
-                    # conjoin
+        """Return abstraction of `u`, by iteration.
+
+        Edges are memoized in `cache`,
+        because quantification does not
+        commute with negation,
+        and below the last quantified level
+        an edge is its own abstraction.
+        """
+        succ = self._succ
+        ite = self.ite
+        find_or_add = self.find_or_add
+        bottom = ordvar[-1] if ordvar else -1
+        cache.setdefault(1, 1)
+        cache.setdefault(-1, -1)
+        stack = [u]
+        while stack:
+            x = stack[-1]
+            if x in cache:
+                stack.pop()
+                continue
+            i, v, w = succ[abs(x)]
+            if not v:
+                raise AssertionError(v)
+            if not w:
+                raise AssertionError(w)
+            # exhausted valuation ?
+            if i > bottom:
+                cache[x] = x
+                stack.pop()
+                continue
+            # complement ?
+            if x < 0:
+                v, w = -v, -w
+            # children pending ?
+            pending = False
+            if w not in cache:
+                stack.append(w)
+                pending = True
+            if v not in cache:
+                stack.append(v)
+                pending = True
+            if pending:
+                continue
+            p = cache[v]
+            q = cache[w]
+            if i in qvars:
+                if forall:
+                    r = ite(p, q, -1)
+                        # conjoin
+                else:
+                    r = ite(p, 1, q)
+                        # disjoin
             else:
-                r = self.ite(p, 1, q)
-                    # disjoin
-        else:
-            r = self.find_or_add(i, p, q)
-        cache[u] = r
-        return r
+                r = find_or_add(i, p, q)
+            cache[x] = r
+            stack.pop()
+        return cache[u]
 
     def forall(
             self,
@@ -1419,7 +1674,15 @@ class BDD(dd._abc.BDD[_Ref]):
             ) -> _Ref:
         # wrap so reordering can
         # delete unused nodes
-        return self._ite(g, u, v)
+        #
+        # The recursion depth of `_ite()` is
+        # at most the number of levels.
+        # Recursion is faster in CPython,
+        # so iteration is used only where
+        # the recursion limit could be reached.
+        if 2 * len(self.vars) < sys.getrecursionlimit():
+            return self._ite(g, u, v)
+        return self._ite_iterative(g, u, v)
 
     def _ite(
             self,
@@ -1437,22 +1700,223 @@ class BDD(dd._abc.BDD[_Ref]):
         elif g == -1:
             return v
         # g is non-terminal
+        # standard triples
+        # (a branch equal to `g` or `-g` is constant)
+        if u == g:
+            u = 1
+        elif u == -g:
+            u = -1
+        if v == g:
+            v = -1
+        elif v == -g:
+            v = 1
+        # trivial cases ?
+        if u == v:
+            return u
+        if u == 1 and v == -1:
+            return g
+        if u == -1 and v == 1:
+            return -g
         # already computed ?
         r = (g, u, v)
-        w = self._ite_table.get(r)
-        if w is not None:
-            return w
-        z = min(self._succ[abs(g)][0],
-                self._succ[abs(u)][0],
-                self._succ[abs(v)][0])
-        g0, g1 = self._top_cofactor(g, z)
-        u0, u1 = self._top_cofactor(u, z)
-        v0, v1 = self._top_cofactor(v, z)
+        table = self._ite_table
+        slot = hash(r) & self._ite_table_mask
+        entry = table.get(slot)
+        if entry is not None and entry[0] == r:
+            return entry[1]
+        succ = self._succ
+        ig, g0, g1 = succ[abs(g)]
+        iu, u0, u1 = succ[abs(u)]
+        iv, v0, v1 = succ[abs(v)]
+        z = ig if ig < iu else iu
+        if iv < z:
+            z = iv
+        # cofactors (inlined `self._top_cofactor()`)
+        if ig != z:
+            g0 = g1 = g
+        elif g < 0:
+            g0, g1 = -g0, -g1
+        if iu != z:
+            u0 = u1 = u
+        elif u < 0:
+            u0, u1 = -u0, -u1
+        if iv != z:
+            v0 = v1 = v
+        elif v < 0:
+            v0, v1 = -v0, -v1
         p = self._ite(g0, u0, v0)
         q = self._ite(g1, u1, v1)
         w = self.find_or_add(z, p, q)
         # cache
-        self._ite_table[r] = w
+        table[slot] = (r, w)
+        return w
+
+    def _ite_iterative(
+            self,
+            g:
+                _Ref,
+            u:
+                _Ref,
+            v:
+                _Ref
+            ) -> _Ref:
+        """Return ternary conditional, by iteration.
+
+        The stack holds triples to expand,
+        and pairs `(triple, level)` to combine
+        the two topmost results.
+        """
+        succ = self._succ
+        table = self._ite_table
+        mask = self._ite_table_mask
+        find_or_add = self.find_or_add
+        results = list()
+        stack = [(g, u, v)]
+        # bind methods to locals
+        push = stack.append
+        pop = stack.pop
+        put = results.append
+        get = results.pop
+        while stack:
+            t = pop()
+            if len(t) == 2:
+                # combine
+                t, z = t
+                q = get()
+                p = get()
+                w = find_or_add(z, p, q)
+                # cache
+                table[hash(t) & mask] = (t, w)
+                put(w)
+                continue
+            g, u, v = t
+            # is g terminal ?
+            if g == 1:
+                put(u)
+                continue
+            elif g == -1:
+                put(v)
+                continue
+            # g is non-terminal
+            # standard triples
+            # (a branch equal to `g` or `-g` is constant)
+            if u == g or u == -g or v == g or v == -g:
+                if u == g:
+                    u = 1
+                elif u == -g:
+                    u = -1
+                if v == g:
+                    v = -1
+                elif v == -g:
+                    v = 1
+                t = (g, u, v)
+            # trivial cases ?
+            if u == v:
+                put(u)
+                continue
+            if u == 1 and v == -1:
+                put(g)
+                continue
+            if u == -1 and v == 1:
+                put(-g)
+                continue
+            # already computed ?
+            entry = table.get(hash(t) & mask)
+            if entry is not None and entry[0] == t:
+                put(entry[1])
+                continue
+            ig, g0, g1 = succ[abs(g)]
+            iu, u0, u1 = succ[abs(u)]
+            iv, v0, v1 = succ[abs(v)]
+            z = min(ig, iu, iv)
+            # cofactors (inlined `self._top_cofactor()`)
+            if ig != z:
+                g0 = g1 = g
+            elif g < 0:
+                g0, g1 = -g0, -g1
+            if iu != z:
+                u0 = u1 = u
+            elif u < 0:
+                u0, u1 = -u0, -u1
+            if iv != z:
+                v0 = v1 = v
+            elif v < 0:
+                v0, v1 = -v0, -v1
+            push((t, z))
+            push((g1, u1, v1))
+            push((g0, u0, v0))
+        r, = results
+        return r
+
+    @_try_to_reorder
+    def _and(
+            self,
+            u:
+                _Ref,
+            v:
+                _Ref
+            ) -> _Ref:
+        """Return conjunction of `u` and `v`.
+
+        Same as `self.ite(u, v, -1)`,
+        computed by recursing on two operands.
+        """
+        # wrap so reordering can
+        # delete unused nodes
+        # (recursion depth as in `ite()`)
+        if 2 * len(self.vars) >= sys.getrecursionlimit():
+            return self._ite_iterative(u, v, -1)
+        return self._conjoin(u, v)
+
+    def _conjoin(
+            self,
+            u:
+                _Ref,
+            v:
+                _Ref
+            ) -> _Ref:
+        """Recurse to compute conjunction.
+
+        Results are cached in `self._ite_table`,
+        with pairs as keys.
+        """
+        # terminal or trivial ?
+        if u == -1 or v == -1:
+            return -1
+        if u == 1:
+            return v
+        if v == 1 or u == v:
+            return u
+        if u == -v:
+            return -1
+        # conjunction is commutative
+        if u > v:
+            u, v = v, u
+        # already computed ?
+        r = (u, v)
+        table = self._ite_table
+        slot = hash(r) & self._ite_table_mask
+        entry = table.get(slot)
+        if entry is not None and entry[0] == r:
+            return entry[1]
+        succ = self._succ
+        iu, u0, u1 = succ[abs(u)]
+        iv, v0, v1 = succ[abs(v)]
+        z = iu if iu < iv else iv
+        # cofactors (inlined `self._top_cofactor()`)
+        if iu != z:
+            u0 = u1 = u
+        elif u < 0:
+            u0, u1 = -u0, -u1
+        if iv != z:
+            v0 = v1 = v
+        elif v < 0:
+            v0, v1 = -v0, -v1
+        p = self._conjoin(u0, v0)
+        q = self._conjoin(u1, v1)
+        w = self.find_or_add(z, p, q)
+        # cache
+        table[slot] = (r, w)
         return w
 
     def find_or_add(
@@ -1491,11 +1955,12 @@ class BDD(dd._abc.BDD[_Ref]):
                 f'declared variables ({len(self.vars)}) '
                 '(the set of levels is expected to '
                 'comprise of contiguous numbers)')
-        if abs(v) not in self._succ:
+        succ = self._succ
+        if abs(v) not in succ:
             raise ValueError(
                 f'argument: {v = } is not '
                 'a reference to an existing BDD node')
-        if abs(w) not in self._succ:
+        if abs(w) not in succ:
             raise ValueError(
                 f'argument: {w = } is not '
                 'a reference to an existing BDD node')
@@ -1509,42 +1974,143 @@ class BDD(dd._abc.BDD[_Ref]):
         if v == w:
             return r * v
         # already exists ?
+        # (the tuple `t` is the key in `_pred`
+        # and the value in `_succ`)
         t = (i, v, w)
-        u = self._pred.get(t)
+        pred = self._pred
+        u = pred.get(t)
         if u is not None:
             return r * u
         # find a free integer
-        u = self._min_free
-        if u <= 1:
+        u = self._allocate_int()
+        # add node
+        pred[t] = u
+        succ[u] = t
+        ref = self._ref
+        ref[u] = 0
+        # increment reference counters
+        # (inlined `self.incref()`,
+        # here `w > 0`)
+        ref[abs(v)] += 1
+        ref[w] += 1
+        return r * u
+
+    def _find_or_add_many(
+            self,
+            i:
+                _Level,
+            pairs:
+                _abc.Iterable[
+                    tuple[_Ref, _Ref]]
+            ) -> list[_Ref]:
+        """Return references to nodes at level `i`.
+
+        Same as calling `find_or_add(i, v, w)`
+        for each `(v, w)` in `pairs`,
+        with the level checked once,
+        and attribute lookups bound once.
+
+        @param pairs:
+            low and high edges
+        """
+        _request_reordering(self)
+        if not (0 <= i < len(self.vars)):
+            raise ValueError(
+                f'The given level: {i = } is not in '
+                f'`range({len(self.vars)})`')
+        succ = self._succ
+        pred = self._pred
+        ref = self._ref
+        nodes = list()
+        for v, w in pairs:
+            if abs(v) not in succ:
+                raise ValueError(
+                    f'argument: {v = } is not '
+                    'a reference to an existing BDD node')
+            if abs(w) not in succ:
+                raise ValueError(
+                    f'argument: {w = } is not '
+                    'a reference to an existing BDD node')
+            # ensure canonicity of complemented edges
+            if w < 0:
+                v, w = -v, -w
+                r = -1
+            else:
+                r = 1
+            # eliminate
+            if v == w:
+                nodes.append(r * v)
+                continue
+            # already exists ?
+            t = (i, v, w)
+            u = pred.get(t)
+            if u is not None:
+                nodes.append(r * u)
+                continue
+            # add node
+            u = self._allocate_int()
+            pred[t] = u
+            succ[u] = t
+            ref[u] = 0
+            ref[abs(v)] += 1
+            ref[w] += 1
+            nodes.append(r * u)
+        return nodes
+
+    def _allocate_int(
+            self
+            ) -> _Nat:
+        """Return an unused integer for a new node.
+
+        The integer is `self._min_free`,
+        which is advanced to the next unused integer.
+        Raise `RuntimeError` if no unused integer
+        below `self.max_nodes` remains after it.
+        """
+        succ = self._succ
+        u = self._min_free
+        if u <= 1:
             raise AssertionError(
                 f'min free index is {u}, '
                 'which is <= 1')
-        if u in self._succ:
+        if u in succ:
             raise AssertionError(
                 f'node index {u} '
                 'is already used. '
                 f'{self._succ = }')
-        # add node
-        self._pred[t] = u
-        self._succ[u] = t
-        self._ref[u] = 0
-        self._min_free = self._next_free_int(u)
-        # increment reference counters
-        self.incref(v)
-        self.incref(w)
-        return r * u
+        # usually the next integer is unused
+        # (`_next_free_int()` applies `max_nodes`)
+        k = u + 1
+        if k >= self.max_nodes or k in succ:
+            k = self._next_free_int(k)
+        self._min_free = k
+        return u
 
     def _next_free_int(
             self,
             start:
                 _Nat
             ) -> _Nat:
-        """Return smallest unused integer `> start`."""
+        """Return smallest unused integer `> start`.
+
+        Integers freed by garbage collection
+        are taken from the heap `self._free_nodes`,
+        instead of testing each integer.
+        """
         if start < 1:
             raise ValueError(
                 f'{start} = start < 1')
+        succ = self._succ
+        free = self._free_nodes
+        # discard reused integers
+        while free and (
+                free[0] < start or
+                free[0] in succ):
+            _hp.heappop(free)
+        if free and free[0] < self.max_nodes:
+            return free[0]
         for i in range(start, self.max_nodes):
-            if i not in self._succ:
+            if i not in succ:
                 return i
         raise RuntimeError(
             'full: reached `self.max_nodes` nodes '
@@ -1566,16 +2132,17 @@ class BDD(dd._abc.BDD[_Ref]):
         all nodes are scanned for zero reference counts.
         """
         n = len(self)
+        ref = self._ref
         if roots is None:
-            roots = self._ref
-        def is_unused(
-                u
-                ) -> _Yes:
-            return not self._ref[abs(u)]
-        unused = filter(
-            is_unused, roots)
-        unused = set(map(
-            abs, unused))
+            # scan the counters directly,
+            # the keys of `ref` are nodes
+            unused = {
+                u for u, k in ref.items()
+                if not k}
+        else:
+            unused = {
+                abs(u) for u in roots
+                if not ref[abs(u)]}
         # keep terminal
         #
         # Filtering above implies 1 is kept,
@@ -1583,38 +2150,64 @@ class BDD(dd._abc.BDD[_Ref]):
         # There `roots` happens to be `None`.
         if 1 in unused:
             unused.remove(1)
+        succ = self._succ
+        pred = self._pred
+        free = self._free_nodes
+        min_free = self._min_free
         while unused:
             u = unused.pop()
             if u == 1:
                 raise AssertionError(u)
             # remove
-            i, v, w = self._succ.pop(u)
+            t = succ.pop(u)
+            i, v, w = t
             if not v:
                 raise AssertionError(v)
             if not w:
                 raise AssertionError(w)
-            u_ = self._pred.pop((i, v, w))
-            uref = self._ref.pop(u)
-            self._min_free = min(u, self._min_free)
+            u_ = pred.pop(t)
+            uref = ref.pop(u)
+            _hp.heappush(free, u)
+            if u < min_free:
+                min_free = u
             if u != u_:
                 raise AssertionError((u, u_))
             if uref:
                 raise AssertionError(uref)
-            if self._min_free <= 1:
-                raise AssertionError(self._min_free)
             # decrement reference counters
-            self.decref(v)
-            self.decref(w)
+            # (inlined `self.decref()`,
+            # the counters are positive,
+            # because `u` referenced `v` and `w`)
+            v = abs(v)
+            ref[v] -= 1
+            ref[w] -= 1
             # unused ?
-            if not self._ref[abs(v)] and abs(v) != 1:
-                unused.add(abs(v))
-            if not self._ref[w] and w != 1:
+            if not ref[v] and v != 1:
+                unused.add(v)
+            if not ref[w] and w != 1:
                 unused.add(w)
-        self._ite_table = dict()
+        if min_free <= 1:
+            raise AssertionError(min_free)
+        self._min_free = min_free
         m = len(self)
         k = n - m
         if k < 0:
             raise AssertionError((n, m))
+        # cached results remain valid
+        # while no node index is freed
+        if not k:
+            return
+        # remove only the `ite` results
+        # that involve freed nodes
+        # (keys are triples for `ite`,
+        # and pairs for conjunction)
+        table = self._ite_table
+        for slot, (t, w) in list(table.items()):
+            stale = abs(w) not in succ or any(
+                abs(x) not in succ for x in t)
+            if stale:
+                del table[slot]
+        self._memo_tables = dict()
 
     def update_predecessors(
             self
@@ -1653,9 +2246,6 @@ class BDD(dd._abc.BDD[_Ref]):
         @param x, y:
             variable name or level
         """
-        if all_levels is None:
-            self.collect_garbage()
-            all_levels = self._levels()
         logger.debug(
             f'swap variables "{x}" and "{y}"')
         if x in self.vars:
@@ -1685,8 +2275,19 @@ class BDD(dd._abc.BDD[_Ref]):
         if abs(x - y) != 1:
             raise ValueError(
                 (x, y))
+        succ = self._succ
+        pred = self._pred
+        ref = self._ref
+        if all_levels is None:
+            self.collect_garbage()
+            # only levels `x, y` are read,
+            # so the other levels are not collected
+            all_levels = {x: set(), y: set()}
+            for u, (i, _, _) in succ.items():
+                if i == x or i == y:
+                    all_levels[i].add(u)
         # count nodes
-        oldsize = len(self._succ)
+        oldsize = len(succ)
         # collect levels x and y
         levels: dict[
                 _Ref,
@@ -1694,55 +2295,60 @@ class BDD(dd._abc.BDD[_Ref]):
             ] = {
                 x: dict(),
                 y: dict()}
+        # (the tuples of `succ` are reused,
+        # as keys of `pred` too)
         for j in (x, y):
             for u in all_levels[j]:
-                i, v, w = self._succ[abs(u)]
-                if i != j:
+                t = succ[abs(u)]
+                if t[0] != j:
                     raise AssertionError(
-                        (i, x, y))
-                u_ = self._pred.pop(
-                    (i, v, w))
+                        (t[0], x, y))
+                u_ = pred.pop(t)
                 if u != u_:
                     raise AssertionError(
                         (u, u_))
-                levels[j][u] = (v, w)
+                levels[j][u] = t
         # move level y up
-        for u, (v, w) in levels[y].items():
-            i, _, _ = self._succ[u]
+        for u, (_, v, w) in levels[y].items():
+            i, _, _ = succ[u]
             if i != y:
                 raise AssertionError((i, y))
             r = (x, v, w)
-            self._succ[u] = r
-            if r in self._pred:
+            succ[u] = r
+            if r in pred:
                 raise AssertionError(r)
-            self._pred[r] = u
+            pred[r] = u
         # move level x down
+        x_items = tuple(levels[x].items())
         # first x nodes independent of y
         done = set()
-        for u, (v, w) in levels[x].items():
-            i, _, _ = self._succ[u]
+        for u, (_, v, w) in x_items:
+            i, _, _ = succ[u]
             if i != x:
                 raise AssertionError((i, x))
             if not v:
                 raise AssertionError(v)
             if not w:
                 raise AssertionError(w)
-            iv, v0, v1 = self._low_high(v)
-            iw, w0, w1 = self._low_high(w)
+            iv, _, _ = succ[abs(v)]
+            iw, _, _ = succ[w]
             # dependeds on y ?
             if iv <= y or iw <= y:
                 continue
             # independent of y
             r = (y, v, w)
-            self._succ[u] = r
-            if r in self._pred:
+            succ[u] = r
+            if r in pred:
                 raise AssertionError(r)
-            self._pred[r] = u
+            pred[r] = u
             done.add(u)
         # x nodes dependent on y
         garbage = set()
         xfresh = set()
-        for u, (v, w) in levels[x].items():
+        dependent = list()
+        low_pairs = list()
+        high_pairs = list()
+        for u, (_, v, w) in x_items:
             # for type checking
             match u:
                 case int():
@@ -1751,22 +2357,34 @@ class BDD(dd._abc.BDD[_Ref]):
                     raise AssertionError(u)
             if u in done:
                 continue
-            i, _, _ = self._succ[u]
+            i, _, _ = succ[u]
             if i != x:
                 raise AssertionError((i, x))
             if not v:
                 raise AssertionError(v)
             if not w:
                 raise AssertionError(w)
-            self.decref(v)
-            self.decref(w)
+            # decrement reference counters
+            # (inlined `self.decref()`,
+            # here the counters are positive)
+            ref[abs(v)] -= 1
+            ref[w] -= 1
             # possibly unused
             garbage.add(abs(v))
             garbage.add(w)
-            # calling cofactor can fail
-            # because y moved
-            iv, v0, v1 = self._swap_cofactor(v, y)
-            iw, w0, w1 = self._swap_cofactor(w, y)
+            # cofactors wrt y
+            # (a node above y was at y
+            # when the swap started)
+            iv, v0, v1 = succ[abs(v)]
+            if y < iv:
+                v0 = v1 = v
+            else:
+                iv = y
+            iw, w0, w1 = succ[w]
+            if y < iw:
+                w0 = w1 = w
+            else:
+                iw = y
             # x node depends on y
             if not (y <= iv and y <= iw):
                 raise AssertionError(
@@ -1777,50 +2395,59 @@ class BDD(dd._abc.BDD[_Ref]):
             # complemented edge ?
             if v < 0 and y == iv:
                 v0, v1 = -v0, -v1
-            p = self.find_or_add(
-                y, v0, w0)
-            q = self.find_or_add(
-                y, v1, w1)
+            dependent.append(u)
+            low_pairs.append((v0, w0))
+            high_pairs.append((v1, w1))
+        # the new nodes at level y are
+        # not successors of x nodes,
+        # so they can be added in batches
+        lows = self._find_or_add_many(y, low_pairs)
+        highs = self._find_or_add_many(y, high_pairs)
+        for u, p, q in zip(dependent, lows, highs):
             if q < 0:
                 raise AssertionError(q)
             if p == q:
                 raise AssertionError(
                     'No elimination: '
                     'node depends on both x and y')
-            if self._succ[abs(p)][0] == y:
+            if succ[abs(p)][0] == y:
                 xfresh.add(abs(p))
-            if self._succ[q][0] == y:
+            if succ[q][0] == y:
                 xfresh.add(q)
             r = (x, p, q)
-            self._succ[u] = r
-            if r in self._pred:
+            succ[u] = r
+            if r in pred:
                 raise AssertionError(
-                    (u, r, levels, self._pred))
-            self._pred[r] = u
-            self.incref(p)
-            self.incref(q)
+                    (u, r, levels, pred))
+            pred[r] = u
+            # (inlined `self.incref()`)
+            ref[abs(p)] += 1
+            ref[q] += 1
             # garbage collection could be interleaved
             # but only if there is
             # substantial loss of efficiency
-        # swap x and y in `vars`
-        vx = self.var_at_level(x)
+        # swap x and y in `vars`,
+        # and in its inverse (in place)
+        level_to_var = self._level_to_var
+        vx = level_to_var[x]
+        vy = level_to_var[y]
         self.vars[vx] = y
-        vy = self.var_at_level(y)
         self.vars[vy] = x
-        # reset
-        self._level_to_var[y] = vx
-        self._level_to_var[x] = vy
+        level_to_var[y] = vx
+        level_to_var[x] = vy
         self._ite_table = dict()
+        self._canon_table = dict()
+        self._memo_tables = dict()
         # count nodes
         self.collect_garbage(garbage)
-        newsize = len(self._succ)
+        newsize = len(succ)
         # new levels
         newx = set()
         newy = set()
         for u in levels[x]:
-            if u not in self._succ:
+            if u not in succ:
                 continue
-            i, _, _ = self._succ[u]
+            i, _, _ = succ[u]
             if i == x:
                 newy.add(u)
             elif i == y:
@@ -1829,15 +2456,15 @@ class BDD(dd._abc.BDD[_Ref]):
                 raise AssertionError(
                     (u, i, x, y))
         for u in xfresh:
-            i, _, _ = self._succ[u]
+            i, _, _ = succ[u]
             if i != y:
                 raise AssertionError(
                     (u, i, x, y))
             newx.add(u)
         for u in levels[y]:
-            if u not in self._succ:
+            if u not in succ:
                 continue
-            i, _, _ = self._succ[u]
+            i, _, _ = succ[u]
             if i != x:
                 raise AssertionError(
                     (u, i, x, y))
@@ -1848,62 +2475,6 @@ class BDD(dd._abc.BDD[_Ref]):
             oldsize,
             newsize)
 
-    def _low_high(
-            self,
-            u:
-                _Ref
-            ) -> tuple[
-                _Level,
-                _Ref,
-                _Node]:
-        """Return level, low, and high.
-
-        If node `u` is a leaf,
-        then `u` is returned as low and high.
-
-        This method is similar to the
-        method `succ`, but different.
-
-        @return:
-            (level, low, high)
-        """
-        i, v, w = self._succ[abs(u)]
-        if abs(u) == 1:
-            return i, u, u
-        if not v:
-            raise AssertionError(v)
-        if not w:
-            raise AssertionError(w)
-        return i, v, w
-
-    def _swap_cofactor(
-            self,
-            u:
-                _Ref,
-            y:
-                _Level
-            ) -> tuple[
-                _Level,
-                _Ref,
-                _Ref]:
-        """Return cofactor of node `u` wrt level `y`.
-
-        If node `u` is above level `y`, that means
-        it was at level `y` when the swap started.
-        To account for this,
-        `y` is returned as the node level.
-        """
-        i, v, w = self._succ[abs(u)]
-        if y < i:
-            return (i, u, u)
-        # restore index of y node that
-        # moved up
-        if not v:
-            raise AssertionError(v)
-        if not w:
-            raise AssertionError(w)
-        return (y, v, w)
-
     def count(
             self,
             u:
@@ -1917,9 +2488,7 @@ class BDD(dd._abc.BDD[_Ref]):
             raise ValueError(u)
         # index those levels in
         # support separately
-        levels = {
-            self.level_of_var(var)
-            for var in self.support(u)}
+        levels = self.support(u, as_levels=True)
         k = len(levels)
         if n is None:
             n = k
@@ -1937,7 +2506,7 @@ class BDD(dd._abc.BDD[_Ref]):
             d=dict())
         i, _, _ = self._succ[abs(u)]
         i = map_level[i]
-        n_models = r * 2**i
+        n_models = r << i
         return self._assert_int(n_models)
 
     @staticmethod
@@ -1970,40 +2539,62 @@ class BDD(dd._abc.BDD[_Ref]):
                     _Node,
                     _Nat]
             ) -> _Nat:
-        """Recurse to compute the number of models."""
+        """Return the number of models, by iteration.
+
+        Counts are memoized in `d`
+        for regular edges.
+        """
         # terminal ?
         if u == 1:
             return 1
         if u == -1:
             return 0
-        i, v, w = self._succ[abs(u)]
-        if not v:
-            raise AssertionError(v)
-        if not w:
-            raise AssertionError(w)
-        i = map_level[i]
-        # memoized ?
-        if abs(u) in d:
-            n = d[abs(u)]
+        succ = self._succ
+        n_all = map_level['all']
+        d.setdefault(1, 1)
+        stack = [abs(u)]
+        while stack:
+            x = stack[-1]
+            if x in d:
+                stack.pop()
+                continue
+            i, v, w = succ[x]
+            if not v:
+                raise AssertionError(v)
+            if not w:
+                raise AssertionError(w)
+            # children pending ?
+            if w not in d:
+                stack.append(w)
+                if abs(v) not in d:
+                    stack.append(abs(v))
+                continue
+            if abs(v) not in d:
+                stack.append(abs(v))
+                continue
+            i = map_level[i]
+            iv, _, _ = succ[abs(v)]
+            iw, _, _ = succ[w]
+            iv = map_level[iv]
+            iw = map_level[iw]
+            nv = d[abs(v)]
             # complement ?
-            if u < 0:
-                n = 2**(map_level['all'] - i) - n
-            return self._assert_int(n)
-        # non-terminal
-        nv = self._sat_len(v, map_level, d)
-        nw = self._sat_len(w, map_level, d)
-        iv, _, _ = self._succ[abs(v)]
-        iw, _, _ = self._succ[w]
-        iv = map_level[iv]
-        iw = map_level[iw]
-        # sum
-        n = self._assert_int(
-            nv * 2**(iv - i - 1) +
-            nw * 2**(iw - i - 1))
-        d[abs(u)] = n
+            if v < 0:
+                nv = (1 << (n_all - iv)) - nv
+            nw = d[w]
+            # sum
+            # (shifts are exact,
+            # and raise for negative amounts)
+            d[x] = (
+                (nv << (iv - i - 1)) +
+                (nw << (iw - i - 1)))
+            stack.pop()
+        n = d[abs(u)]
         # complement ?
         if u < 0:
-            n = 2**(map_level['all'] - i) - n
+            i, _, _ = succ[abs(u)]
+            i = map_level[i]
+            n = (1 << (n_all - i)) - n
         return self._assert_int(n)
 
     def pick_iter(
@@ -2035,11 +2626,18 @@ class BDD(dd._abc.BDD[_Ref]):
             logger.warning(
                 'Missing bits:  '
                 f'support - care_vars = {missing}')
+        care_vars = set(care_vars)
         cube = dict()
         value = True
         cubes = self._sat_iter(
             u, cube, value)
         for cube in cubes:
+            # complete assignment ?
+            # (each cube is a new `dict`,
+            # so it is yielded without copying)
+            if care_vars.issubset(cube):
+                yield cube
+                continue
             minterms = _enumerate_minterms(
                 cube, care_vars)
             for m in minterms:
@@ -2057,31 +2655,50 @@ class BDD(dd._abc.BDD[_Ref]):
                 bool
             ) -> _abc.Iterable[
                 _Assignment]:
-        """Recurse to enumerate models."""
-        if u < 0:
-            value = not value
-        # terminal ?
-        if abs(u) == 1:
-            if value:
-                cube = {
-                    self._level_to_var[i]: v
-                    for i, v in cube.items()}
-                yield cube
-            return
-        # non-terminal
-        i, v, w = self._succ[abs(u)]
-        if not v:
-            raise AssertionError(v)
-        if not w:
-            raise AssertionError(w)
-        d0 = dict(cube)
-        d0[i] = False
-        d1 = dict(cube)
-        d1[i] = True
-        for x in self._sat_iter(v, d0, value):
-            yield x
-        for x in self._sat_iter(w, d1, value):
-            yield x
+        """Enumerate models.
+
+        Depth-first search with an explicit stack.
+        The `dict` `cube` is modified in place along
+        the current path, and restored when backtracking,
+        so one `dict` is yielded per model,
+        and none is copied per node.
+        """
+        succ = self._succ
+        level_to_var = self._level_to_var
+        # levels assigned along the current path
+        path = list()
+        # items are:
+        # `(edge, value, length of path,
+        #   level to assign, value to assign)`
+        stack = [(u, value, 0, None, None)]
+        while stack:
+            u, value, depth, i, bit = stack.pop()
+            # backtrack
+            while len(path) > depth:
+                del cube[path.pop()]
+            if i is not None:
+                cube[i] = bit
+                path.append(i)
+            if u < 0:
+                value = not value
+                u = -u
+            # terminal ?
+            if u == 1:
+                if value:
+                    yield {
+                        level_to_var[j]: b
+                        for j, b in cube.items()}
+                continue
+            # non-terminal
+            i, v, w = succ[u]
+            if not v:
+                raise AssertionError(v)
+            if not w:
+                raise AssertionError(w)
+            depth = len(path)
+            # low successor is visited first
+            stack.append((w, value, depth, i, True))
+            stack.append((v, value, depth, i, False))
 
     def assert_consistent(
             self
@@ -2173,30 +2790,45 @@ class BDD(dd._abc.BDD[_Ref]):
             cache:
                 dict[int, str]
             ) -> _Formula:
-        if u == 1:
-            return 'TRUE'
+        """Return formula of `u`, by iteration.
+
+        Formulas are memoized in `cache`
+        for regular edges.
+        """
         if u == -1:
             return 'FALSE'
-        if u in cache:
-            return cache[u]
-        level, v, w = self._succ[abs(u)]
-        if not v:
-            raise AssertionError(v)
-        if not w:
-            raise AssertionError(w)
-        var = self._level_to_var[level]
-        p = self._to_expr(v, cache)
-        q = self._to_expr(w, cache)
-        # pure var ?
-        if p == 'FALSE' and q == 'TRUE':
-            expr = var
-        else:
-            expr = f'ite({var}, {q}, {p})'
-        # complemented ?
-        if u < 0:
-            expr = f'(~ {expr})'
-        cache[u] = expr
-        return expr
+        succ = self._succ
+        cache.setdefault(1, 'TRUE')
+        stack = [abs(u)]
+        while stack:
+            x = stack[-1]
+            if x in cache:
+                stack.pop()
+                continue
+            level, v, w = succ[x]
+            if not v:
+                raise AssertionError(v)
+            if not w:
+                raise AssertionError(w)
+            # children pending ?
+            if w not in cache:
+                stack.append(w)
+                if abs(v) not in cache:
+                    stack.append(abs(v))
+                continue
+            if abs(v) not in cache:
+                stack.append(abs(v))
+                continue
+            var = self._level_to_var[level]
+            p = _complement_expr(v, cache)
+            q = cache[w]
+            # pure var ?
+            if p == 'FALSE' and q == 'TRUE':
+                cache[x] = var
+            else:
+                cache[x] = f'ite({var}, {q}, {p})'
+            stack.pop()
+        return _complement_expr(u, cache)
 
     def apply(
             self,
@@ -2211,6 +2843,15 @@ class BDD(dd._abc.BDD[_Ref]):
                 _Ref |
                 None=None
             ) -> _Ref:
+        # binary operator, as from the parser ?
+        # (the arity is then known to be correct)
+        binary = _BINARY_OPERATORS.get(op)
+        if binary is not None and v is not None and w is None:
+            if abs(u) not in self:
+                raise ValueError(u)
+            if abs(v) not in self:
+                raise ValueError(v)
+            return binary(self, u, v)
         _utils.assert_operator_arity(op, v, w, 'bdd')
         if abs(u) not in self:
             raise ValueError(u)
@@ -2218,47 +2859,16 @@ class BDD(dd._abc.BDD[_Ref]):
             raise ValueError(v)
         if w is not None and abs(w) not in self:
             raise ValueError(w)
+        # `assert_operator_arity()` above implies
+        # that only unary operators have `v is None`,
+        # and only ternary operators have `w is not None`
         # unary
-        if op in ('~', 'not', '!'):
+        if v is None:
             return -u
-        # Implied by `assert_operator_arity()` above,
-        # present here for type-checking.
-        elif v is None:
-            raise ValueError(
-                '`v is None`')
-        # binary
-        elif op in ('or', r'\/', '|', '||'):
-            return self.ite(u, 1, v)
-        elif op in ('and', '/\\', '&', '&&'):
-            return self.ite(u, v, -1)
-        elif op in ('#', 'xor', '^'):
-            return self.ite(u, -v, v)
-        elif op in ('=>', '->', 'implies'):
-            return self.ite(u, v, 1)
-        elif op in ('<=>', '<->', 'equiv'):
-            return self.ite(u, v, -v)
-        elif op in ('diff', '-'):
-            return self.ite(u, -v, -1)
-        elif op in (r'\A', 'forall'):
-            qvars = self.support(u)
-            return self.quantify(
-                v, qvars,
-                forall=True)
-        elif op in (r'\E', 'exists'):
-            qvars = self.support(u)
-            return self.quantify(
-                v, qvars,
-                forall=False)
-        # Implied by `assert_operator_arity()` above,
-        # present here for type-checking.
-        elif w is None:
-            raise ValueError(
-                '`w is None`')
         # ternary
-        elif op == 'ite':
-            return self.ite(u, v, w)
-        raise ValueError(
-            f'unknown operator "{op}"')
+        if w is None:
+            raise AssertionError((op, u, v))
+        return self.ite(u, v, w)
 
     def _add_int(
             self,
@@ -2284,12 +2894,23 @@ class BDD(dd._abc.BDD[_Ref]):
             dvars = {
                 k: True
                 for k in dvars}
-        # `dvars` keys can be var names or levels
-        r = self.true
+        literals = list()
         for var, val in dvars.items():
-            u = self.var(var)
-            u = u if val else -u
-            r = self.apply('and', u, r)
+            if var not in self.vars:
+                raise ValueError(
+                    f'undeclared variable "{var}", '
+                    'the declared variables are:\n'
+                    f' {self.vars}')
+            literals.append((self.vars[var], bool(val)))
+        # the BDD of a cube is a chain,
+        # so add the nodes from the bottom up
+        literals.sort(reverse=True)
+        r = self.true
+        for i, val in literals:
+            if val:
+                r = self.find_or_add(i, -1, r)
+            else:
+                r = self.find_or_add(i, r, -1)
         return r
 
     def dump(
@@ -2359,19 +2980,17 @@ class BDD(dd._abc.BDD[_Ref]):
             **kw
             ) -> None:
         """Write BDDs to `filename` as pickle."""
+        succ = self._succ
         if roots is None:
-            nodes = self._succ
+            nodes = succ
         else:
             values = _utils._values_of(roots)
             nodes = self.descendants(values)
-        succ = (
-            (k, self._succ[k])
-            for k in nodes)
         d = dict(
             vars=self.vars,
-            succ=dict(succ),
+            succ={k: succ[k] for k in nodes},
             roots=roots)
-        kw.setdefault('protocol', 2)
+        kw.setdefault('protocol', pickle.DEFAULT_PROTOCOL)
         with open(filename, 'wb') as f:
             pickle.dump(d, f, **kw)
 
@@ -2426,52 +3045,28 @@ class BDD(dd._abc.BDD[_Ref]):
             else:
                 j = self.add_var(var)
             level_map[i] = j
-        umap = dict()
-        for u in succ:
-            # already added ?
-            if u in umap:
-                continue
-            # add
-            self._load(
-                u, succ, umap, level_map)
-        return umap, d['roots']
-
-    def _load(
-            self,
-            u:
-                _Ref,
-            succ:
-                dict,
-            umap:
-                dict,
-            level_map:
-                dict
-            ) -> _Ref:
-        """Recurse to load BDD `u` from `succ`."""
-        # terminal ?
-        if abs(u) == 1:
-            return u
-        # memoized ?
-        if u in umap:
-            r = umap[abs(u)]
+        # successors are at larger levels,
+        # so adding nodes by decreasing level
+        # adds the successors of each node first
+        nodes = sorted(
+            ((t[0], u)
+                for u, t in succ.items()
+                if u != 1),
+            reverse=True)
+        umap = {1: 1}
+        for i, u in nodes:
+            _, v, w = succ[u]
+            p = umap[abs(v)]
+            q = umap[abs(w)]
+            if v < 0:
+                p = -p
+            if w < 0:
+                q = -q
+            r = self.find_or_add(level_map[i], p, q)
             if r <= 0:
                 raise AssertionError(r)
-            if u < 0:
-                r = -r
-            return r
-        i, v, w = succ[abs(u)]
-        j = level_map[i]
-        p = self._load(
-            v, succ, umap, level_map)
-        q = self._load(
-            w, succ, umap, level_map)
-        r = self.find_or_add(j, p, q)
-        if r <= 0:
-            raise AssertionError(r)
-        umap[abs(u)] = r
-        if u < 0:
-            r = -r
-        return r
+            umap[u] = r
+        return umap, d['roots']
 
     def _dump_manager(
             self,
@@ -2479,7 +3074,12 @@ class BDD(dd._abc.BDD[_Ref]):
                 str,
             **kw
             ) -> None:
-        """Write `BDD` to `filename` as pickle."""
+        """Write `BDD` to `filename` as pickle.
+
+        The table `_pred` is written for
+        loading by earlier versions, and is
+        rebuilt from `_succ` when loading.
+        """
         d = dict(
             vars=self.vars,
             max_nodes=self.max_nodes,
@@ -2488,7 +3088,7 @@ class BDD(dd._abc.BDD[_Ref]):
             succ=self._succ,
             ref=self._ref,
             min_free=self._min_free)
-        kw.setdefault('protocol', 2)
+        kw.setdefault('protocol', pickle.DEFAULT_PROTOCOL)
         with open(filename, 'wb') as f:
             pickle.dump(d, f, **kw)
 
@@ -2504,10 +3104,14 @@ class BDD(dd._abc.BDD[_Ref]):
         bdd = cls(d['vars'])
         bdd.max_nodes = d['max_nodes']
         bdd.roots = d['roots']
-        bdd._pred = d['pred']
         bdd._succ = d['succ']
+        bdd.update_predecessors()
         bdd._ref = d['ref']
         bdd._min_free = d['min_free']
+        bdd._free_nodes = [
+            u for u in range(
+                bdd._min_free, max(bdd._succ))
+            if u not in bdd._succ]
         return bdd
 
     @property
@@ -2523,6 +3127,146 @@ class BDD(dd._abc.BDD[_Ref]):
         return 1
 
 
+def _disjoin(
+        bdd:
+            BDD,
+        u:
+            _Ref,
+        v:
+            _Ref
+        ) -> _Ref:
+    return -bdd._and(-u, -v)
+
+
+def _conjoin(
+        bdd:
+            BDD,
+        u:
+            _Ref,
+        v:
+            _Ref
+        ) -> _Ref:
+    return bdd._and(u, v)
+
+
+def _xor(
+        bdd:
+            BDD,
+        u:
+            _Ref,
+        v:
+            _Ref
+        ) -> _Ref:
+    return bdd.ite(u, -v, v)
+
+
+def _implies(
+        bdd:
+            BDD,
+        u:
+            _Ref,
+        v:
+            _Ref
+        ) -> _Ref:
+    return -bdd._and(u, -v)
+
+
+def _equiv(
+        bdd:
+            BDD,
+        u:
+            _Ref,
+        v:
+            _Ref
+        ) -> _Ref:
+    return bdd.ite(u, v, -v)
+
+
+def _diff(
+        bdd:
+            BDD,
+        u:
+            _Ref,
+        v:
+            _Ref
+        ) -> _Ref:
+    return bdd._and(u, -v)
+
+
+def _forall(
+        bdd:
+            BDD,
+        u:
+            _Ref,
+        v:
+            _Ref
+        ) -> _Ref:
+    qvars = bdd.support(u)
+    return bdd.quantify(
+        v, qvars,
+        forall=True)
+
+
+def _exists(
+        bdd:
+            BDD,
+        u:
+            _Ref,
+        v:
+            _Ref
+        ) -> _Ref:
+    qvars = bdd.support(u)
+    return bdd.quantify(
+        v, qvars,
+        forall=False)
+
+
+_BINARY_OPERATORS: _ty.Final = {
+    'or': _disjoin,
+    r'\/': _disjoin,
+    '|': _disjoin,
+    '||': _disjoin,
+    'and': _conjoin,
+    '/\\': _conjoin,
+    '&': _conjoin,
+    '&&': _conjoin,
+    '#': _xor,
+    'xor': _xor,
+    '^': _xor,
+    '=>': _implies,
+    '->': _implies,
+    'implies': _implies,
+    '<=>': _equiv,
+    '<->': _equiv,
+    'equiv': _equiv,
+    'diff': _diff,
+    '-': _diff,
+    r'\A': _forall,
+    'forall': _forall,
+    r'\E': _exists,
+    'exists': _exists}
+    # maps binary operator symbols to
+    # functions that compute the operation
+if set(_BINARY_OPERATORS) != dd._abc.BINARY_OPERATOR_SYMBOLS:
+    raise AssertionError(_BINARY_OPERATORS)
+
+
+def _complement_expr(
+        u:
+            _Ref,
+        cache:
+            dict[int, str]
+        ) -> _Formula:
+    """Return formula of edge `u` from `cache`."""
+    if u == -1:
+        return 'FALSE'
+    expr = cache[abs(u)]
+    # complemented ?
+    if u < 0:
+        expr = f'(~ {expr})'
+    return expr
+
+
 def _enumerate_minterms(
         cube:
             _Assignment,
@@ -2544,12 +3288,10 @@ def _enumerate_minterms(
     # fix order
     bits = list(bits)
     n = len(bits)
-    for i in range(2**n):
-        values = bin(i).lstrip('-0b').zfill(n)
-        model = {
-            k: bool(int(v))
-            for k, v in
-                zip(bits, values)}
+    # the first bit varies slowest
+    for values in _itr.product(
+            (False, True), repeat=n):
+        model = dict(zip(bits, values))
         model.update(cube)
         if len(model) < len(bits):
             raise AssertionError((model, bits))
@@ -2632,14 +3374,12 @@ def rename(
             'a BDD node in the given BDD manager '
             f'`bdd` ({bdd!r})')
     # nothing to rename ?
-    if not dvars:
+    if not dvars or abs(u) == 1:
         return u
     # map variable names to levels
-    levels = bdd.vars
-    dvars = {
-        levels[var]: levels[dvars.get(var, var)]
-        for var in bdd.vars}
-    cache = dict()
+    dvars, frozen = bdd._canon_rename(dvars, total=True)
+    key = ('rename', frozen)
+    cache = bdd._memo_table(key)
     return _copy_bdd(u, dvars, bdd, bdd, cache)
 
 
@@ -2708,6 +3448,43 @@ def _adjacent(
     return False
 
 
+def _find_level_in_support(
+        roots:
+            _abc.Iterable[_Ref],
+        levels:
+            set[_Level],
+        bdd:
+            BDD
+        ) -> _Level | None:
+    """Return a level in `levels` and in the support of `roots`.
+
+    Return `None` if no such level exists.
+    The traversal stops at the first level found,
+    and skips nodes below the bottom level in `levels`.
+    """
+    if not levels:
+        return None
+    bottom = max(levels)
+    succ = bdd._succ
+    visited = set()
+    stack = [abs(u) for u in roots]
+    while stack:
+        u = stack.pop()
+        if u in visited:
+            continue
+        visited.add(u)
+        i, v, w = succ[u]
+        # below `levels` ?
+        # (includes terminal)
+        if i > bottom:
+            continue
+        if i in levels:
+            return i
+        stack.append(abs(v))
+        stack.append(w)
+    return None
+
+
 def _assert_no_overlap(
         d:
             dict
@@ -2753,27 +3530,34 @@ def image(
         else existentially.
     """
     # map to levels
-    qvars = bdd._map_to_level(set(qvars))
-    rename = {
-        bdd.vars.get(k, k): bdd.vars.get(v, v)
-        for k, v in rename.items()}
+    qvars, _ = bdd._canon_levels(qvars)
+    rename, frozen = bdd._canon_rename(rename)
     # init
-    cache = dict()
+    key = (
+        'image', frozen,
+        frozenset(qvars), bool(forall))
+    cache = bdd._memo_table(key)
     rename_u = rename
     rename_v = None
-    # no overlap and neighbors
-    _assert_no_overlap(rename)
-    if not _all_adjacent(rename, bdd):
-        logger.warning(
-            'BDD.image: not all vars adjacent')
+    # no overlap and neighbors,
+    # checked once for each new memo
+    if not cache:
+        _assert_no_overlap(rename)
+        if not _all_adjacent(rename, bdd):
+            logger.warning(
+                'BDD.image: not all vars adjacent')
     # unpriming maps to qvars or
     # outside support of conjunction
-    s = bdd.support(trans, as_levels=True)
-    s.update(bdd.support(source, as_levels=True))
-    s.difference_update(qvars)
-    s.intersection_update(rename.values())
-    if s:
-        raise AssertionError(s)
+    # (traversed only if some unprimed
+    # variable is not quantified)
+    targets = set(rename.values())
+    targets.difference_update(qvars)
+    level = _find_level_in_support(
+        [trans, source], targets, bdd)
+    if level is not None:
+        raise AssertionError(
+            f'level {level} is in the support '
+            'and is not quantified')
     return _image(
         trans, source, rename_u, rename_v,
         qvars, bdd, forall, cache)
@@ -2817,21 +3601,71 @@ def preimage(
         else existentially.
     """
     # map to levels
-    qvars = bdd._map_to_level(set(qvars))
-    rename = {
-        bdd.vars.get(k, k): bdd.vars.get(v, v)
-        for k, v in rename.items()}
+    qvars, _ = bdd._canon_levels(qvars)
+    rename, frozen = bdd._canon_rename(rename)
     # init
-    cache = dict()
+    key = (
+        'preimage', frozen,
+        frozenset(qvars), bool(forall))
+    cache = bdd._memo_table(key)
     rename_u = None
     rename_v = rename
-    # check
-    _assert_valid_rename(target, bdd, rename)
+    # check, once for each new memo
+    if not cache:
+        _assert_valid_rename(target, bdd, rename)
     return _image(
         trans, target, rename_u, rename_v,
         qvars, bdd, forall, cache)
 
 
+def and_exists(
+        u:
+            _Ref,
+        v:
+            _Ref,
+        qvars:
+            _abc.Iterable[_VariableName] |
+            _abc.Iterable[_Level],
+        bdd:
+            BDD
+        ) -> _Ref:
+    r"""Return `\E qvars:  u /\ v`.
+
+    Conjunction and quantification happen
+    in one pass over the BDDs of `u` and `v`,
+    so the BDD of `u /\ v` is not constructed.
+
+    @param qvars:
+        variables to quantify
+    """
+    qvars, _ = bdd._canon_levels(qvars)
+    key = ('and_exists', frozenset(qvars))
+    cache = bdd._memo_table(key)
+    return _image(
+        u, v, None, None,
+        qvars, bdd, False, cache)
+
+
+def or_forall(
+        u:
+            _Ref,
+        v:
+            _Ref,
+        qvars:
+            _abc.Iterable[_VariableName] |
+            _abc.Iterable[_Level],
+        bdd:
+            BDD
+        ) -> _Ref:
+    r"""Return `\A qvars:  u \/ v`.
+
+    @param qvars:
+        variables to quantify
+    """
+    r = and_exists(-u, -v, qvars, bdd)
+    return -r
+
+
 def _image(
         u:
             _Ref,
@@ -2854,11 +3688,22 @@ def _image(
                 tuple[_Ref, _Ref],
                 _Ref]
         ) -> _Ref:
-    """Recursive (pre)image computation.
+    """Compute (pre)image.
 
     Renaming requires that in each pair
     the variables are adjacent.
 
+    Depth-first search with an explicit stack,
+    so the depth of BDDs is not bounded by
+    the recursion limit of Python.
+    The low cofactors are computed first,
+    as in a recursive implementation.
+    At quantified levels, the high cofactors
+    are skipped if the result for the
+    low cofactors is controlling
+    (`TRUE` for existential quantification,
+    `FALSE` for universal quantification).
+
     @param umap:
         renaming of variables in `u`
         that occurs after conjunction of `u` with `v`
@@ -2867,49 +3712,135 @@ def _image(
         renaming of variables in `v`
         that occurs before conjunction with `u`.
     """
+    succ = bdd._succ
+    ite = bdd.ite
+    find_or_add = bdd.find_or_add
+    root = (u, v)
+    # result of quantification that
+    # makes the high cofactors irrelevant
+    controlling = -1 if forall else 1
+    # quantification does not change
+    # nodes below this level
+    max_qvar = max(qvars, default=-1)
+    renamed = umap is not None or vmap is not None
+    # items are:
+    # - `(u, v)` to expand,
+    # - `((u0, v0), (u1, v1), None)` to expand
+    #   `(u1, v1)` unless the result for
+    #   `(u0, v0)` is controlling, or
+    # - `((u, v), z, (u0, v0), (u1, v1))` to
+    #   combine the results for the cofactors
+    #
+    # Each pair is allocated once,
+    # and reused as key of `cache`.
+    stack = [root]
+    while stack:
+        t = stack.pop()
+        if len(t) == 2:
+            u, v = t
+            # controlling values for conjunction ?
+            if u == -1 or v == -1:
+                continue
+            if u == 1 and v == 1:
+                continue
+            # already computed ?
+            if t in cache:
+                continue
+            iu, u0, u1 = succ[abs(u)]
+            jv, v0, v1 = succ[abs(v)]
+            # conjunction with `TRUE`, itself, or
+            # its negation, without renaming ?
+            # (the result is not quantified if
+            # all quantified levels are above it)
+            if not renamed and u == -v:
+                cache[t] = -1
+                continue
+            if not renamed and (u == 1 or u == v):
+                if jv > max_qvar:
+                    cache[t] = v
+                    continue
+            elif v == 1 and umap is None:
+                if iu > max_qvar:
+                    cache[t] = u
+                    continue
+            # descend
+            if vmap is None:
+                iv = jv
+            else:
+                iv = vmap.get(jv, jv)
+            z = iu if iu < iv else iv
+            # cofactors (inlined `bdd._top_cofactor()`),
+            # at most one of `u, v` is a terminal,
+            # so the level of a terminal is `> z`
+            if iu != z:
+                u0 = u1 = u
+            elif u < 0:
+                u0, u1 = -u0, -u1
+            if iv != z:
+                v0 = v1 = v
+            elif v < 0:
+                v0, v1 = -v0, -v1
+            t0 = (u0, v0)
+            t1 = (u1, v1)
+            stack.append((t, z, t0, t1))
+            if z in qvars:
+                stack.append((t0, t1, None))
+            else:
+                stack.append(t1)
+            stack.append(t0)
+            continue
+        if len(t) == 3:
+            t0, t1, _ = t
+            p = _image_result(t0, cache)
+            if p != controlling:
+                stack.append(t1)
+            continue
+        # combine
+        t, z, t0, t1 = t
+        p = _image_result(t0, cache)
+        # quantified ?
+        if z in qvars and p == controlling:
+            r = p
+        elif z in qvars:
+            q = _image_result(t1, cache)
+            if forall:
+                r = ite(p, q, -1)
+                    # conjoin
+            else:
+                r = ite(p, 1, q)
+                    # disjoin
+        else:
+            q = _image_result(t1, cache)
+            if umap is None:
+                m = z
+            else:
+                m = umap.get(z, z)
+            g = find_or_add(m, -1, 1)
+            r = ite(g, q, p)
+        cache[t] = r
+    return _image_result(root, cache)
+
+
+def _image_result(
+        t:
+            tuple[_Ref, _Ref],
+        cache:
+            dict[
+                tuple[_Ref, _Ref],
+                _Ref]
+        ) -> _Ref:
+    """Return (pre)image of pair `t` from `cache`."""
+    r = cache.get(t)
+    if r is not None:
+        return r
+    u, v = t
     # controlling values for conjunction ?
     if u == -1 or v == -1:
         return -1
     if u == 1 and v == 1:
         return 1
-    # already computed ?
-    t = (u, v)
-    w = cache.get(t)
-    if w is not None:
-        return w
-    # recurse (descend)
-    iu, _, _ = bdd._succ[abs(u)]
-    jv, _, _ = bdd._succ[abs(v)]
-    if vmap is None:
-        iv = jv
-    else:
-        iv = vmap.get(jv, jv)
-    z = min(iu, iv)
-    u0, u1 = bdd._top_cofactor(u, z)
-    v0, v1 = bdd._top_cofactor(v, jv + z - iv)
-    p = _image(
-        u0, v0, umap, vmap, qvars,
-        bdd, forall, cache)
-    q = _image(
-        u1, v1, umap, vmap, qvars,
-        bdd, forall, cache)
-    # quantified ?
-    if z in qvars:
-        if forall:
-            r = bdd.ite(p, q, -1)
-                # conjoin
-        else:
-            r = bdd.ite(p, 1, q)
-                # disjoin
-    else:
-        if umap is None:
-            m = z
-        else:
-            m = umap.get(z, z)
-        g = bdd.find_or_add(m, -1, 1)
-        r = bdd.ite(g, q, p)
-    cache[t] = r
-    return r
+    raise AssertionError(
+        f'pair {t} not in `cache`')
 
 
 def reorder(
@@ -2947,9 +3878,17 @@ def _apply_sifting(
     """Apply Rudell's sifting algorithm."""
     bdd.collect_garbage()
     n = len(bdd)
-    # using `set` injects some randomness
     levels = bdd._levels()
-    names = set(bdd.vars)
+    # variables with more nodes first,
+    # as these offer larger reductions
+    def n_nodes(
+            var:
+                _VariableName
+            ) -> _Nat:
+        return len(levels[bdd.vars[var]])
+    names = sorted(
+        bdd.vars, key=n_nodes,
+        reverse=True)
     for var in names:
         k = _reorder_var(bdd, var, levels)
         m = len(bdd)
@@ -2985,10 +3924,19 @@ def _reorder_var(
     # closer to bottom ?
     if (2 * level) >= n:
         start, end = end, start
-    _shift(bdd, level, start, levels)
-    sizes = _shift(bdd, start, end, levels)
+    limit = SIFTING_MAX_GROWTH * m
+    sizes = {level: m}
+    # toward the closer end, back,
+    # and toward the other end
+    sizes.update(_shift(
+        bdd, level, start, levels, limit))
+    i = bdd.level_of_var(var)
+    _shift(bdd, i, level, levels)
+    sizes.update(_shift(
+        bdd, level, end, levels, limit))
+    i = bdd.level_of_var(var)
     k = min(sizes, key=sizes.get)
-    _shift(bdd, end, k, levels)
+    _shift(bdd, i, k, levels)
     m_ = len(bdd)
     if sizes[k] != m_:
         raise AssertionError((sizes[k], m_))
@@ -3007,12 +3955,22 @@ def _shift(
         levels:
             dict[
                 _Level,
-                set[_Ref]]
+                set[_Ref]],
+        limit:
+            float |
+            None=None
         ) -> dict[
             _Level,
             _Level]:
     r"""Shift level `start` to become `end`, by swapping.
 
+    If `limit` is given, then shifting stops
+    at the first level where the number of nodes
+    exceeds `limit`.
+
+    @return:
+        number of nodes for each level reached
+
     ```tla
     ASSUMPTION
         LET
@@ -3035,6 +3993,8 @@ def _shift(
         oldn, n = bdd.swap(i, j, levels)
         sizes[i] = oldn
         sizes[j] = n
+        if limit is not None and n > limit:
+            break
     return sizes
 
 
@@ -3044,8 +4004,13 @@ def _sort_to_order(
         order:
             _VariableLevels
         ) -> None:
-    """Swap variables to obtain `order`."""
-    # TODO: use min number of swaps
+    """Swap variables to obtain `order`.
+
+    Bubble sort of levels, by swapping
+    adjacent variables. The number of swaps is
+    the number of inversions of levels,
+    which is the minimum for adjacent swaps.
+    """
     if len(bdd.vars) != len(order):
         raise ValueError(
             'The number of BDD variables: '
@@ -3054,29 +4019,48 @@ def _sort_to_order(
     m = 0
     levels = bdd._levels()
     n = len(order)
+    # target level of the variable at each level,
+    # kept in sync with swaps
+    targets = [
+        order[bdd.var_at_level(i)]
+        for i in range(n)]
+    _assert_roots_in(bdd)
     for k in range(n):
-        for i in range(n - 1):
-            for root in bdd.roots:
-                if root not in bdd:
-                    raise ValueError(
-                        f'{root} in `bdd.roots` is not '
-                        'a reference to a BDD node in '
-                        'the given BDD manager `bdd` '
-                        f'({bdd!r})')
-            x = bdd.var_at_level(i)
-            y = bdd.var_at_level(i + 1)
-            p = order[x]
-            q = order[y]
-            if p > q:
-                bdd.swap(i, i + 1, levels)
-                m += 1
-                logger.debug(
-                    f'swap: {p} with {q}, {i}')
+        swapped = False
+        for i in range(n - 1 - k):
+            p = targets[i]
+            q = targets[i + 1]
+            if p <= q:
+                continue
+            bdd.swap(i, i + 1, levels)
+            targets[i], targets[i + 1] = q, p
+            swapped = True
+            m += 1
+            logger.debug(
+                f'swap: {p} with {q}, {i}')
+            # swapping collects garbage
+            _assert_roots_in(bdd)
             if logger.getEffectiveLevel() < logging.DEBUG:
                 bdd.assert_consistent()
+        if not swapped:
+            break
     logger.info(f'total swaps: {m}')
 
 
+def _assert_roots_in(
+        bdd:
+            BDD
+        ) -> None:
+    """Raise `ValueError` if `bdd.roots` not in `bdd`."""
+    for root in bdd.roots:
+        if root not in bdd:
+            raise ValueError(
+                f'{root} in `bdd.roots` is not '
+                'a reference to a BDD node in '
+                'the given BDD manager `bdd` '
+                f'({bdd!r})')
+
+
 def reorder_to_pairs(
         bdd:
             BDD,
@@ -3149,52 +4133,81 @@ def _copy_bdd(
         cache:
             dict[_Node, _Ref]
         ) -> _Ref:
-    """Recurse to copy nodes from `old_bdd` to `bdd`.
+    """Copy nodes from `old_bdd` to `bdd`, bottom-up.
+
+    First the nodes reachable from `u` and
+    not in `cache` are collected,
+    without recursion.
+    Then these nodes are mapped from
+    the bottom level up, so the successors
+    of each node are mapped before the node.
 
     @param u:
         node in `old_bdd`
     @param level_map:
         maps old to new levels
+    @param cache:
+        maps nodes in `old_bdd` to
+        (positive) nodes in `bdd`
     """
-    # terminal ?
-    if abs(u) == 1:
-        return u
-    # non-terminal
-    # memoized ?
-    r = cache.get(abs(u))
-    if r is not None:
+    succ = old_bdd._succ
+    # within the same manager,
+    # nodes below all renamed levels are unchanged
+    if old_bdd is bdd:
+        bottom = max(
+            (j for j, k in level_map.items() if j != k),
+            default=-1)
+    else:
+        bottom = None
+    # collect nodes to map
+    nodes = list()
+    visited = set()
+    stack = [abs(u)]
+    while stack:
+        node = stack.pop()
+        if node == 1 or node in visited or node in cache:
+            continue
+        visited.add(node)
+        jold, v, w = succ[node]
+        if not v:
+            raise AssertionError(v)
+        if not w:
+            raise AssertionError(w)
+        if bottom is not None and jold > bottom:
+            cache[node] = node
+            continue
+        nodes.append((jold, node))
+        stack.append(abs(v))
+        stack.append(w)
+    # map, from the bottom level up
+    nodes.sort(reverse=True)
+    ite = bdd.ite
+    jprev = None
+    for jold, node in nodes:
+        # next level ?
+        if jold != jprev:
+            jprev = jold
+            # map this level
+            jnew = level_map[jold]
+            g = bdd.find_or_add(jnew, -1, 1)
+        _, v, w = succ[node]
+        r = abs(v)
+        p = 1 if r == 1 else cache[r]
+        if v < 0:
+            p = -p
+        q = 1 if w == 1 else cache[w]
+        if q <= 0:
+            raise AssertionError(q)
+        r = ite(g, q, p)
+        # memoize
         if r <= 0:
             raise AssertionError(r)
-        # complement ?
-        if u < 0:
-            r = -r
-        return r
-    # recurse
-    jold, v, w = old_bdd._succ[abs(u)]
-    if not v:
-        raise AssertionError(v)
-    if not w:
-        raise AssertionError(w)
-    p = _copy_bdd(
-        v, level_map,
-        old_bdd, bdd,
-        cache)
-    q = _copy_bdd(
-        w, level_map,
-        old_bdd, bdd,
-        cache)
-    if p * v <= 0:
-        raise AssertionError((p, v))
-    if q <= 0:
-        raise AssertionError(q)
-    # map this level
-    jnew = level_map[jold]
-    g = bdd.find_or_add(jnew, -1, 1)
-    r = bdd.ite(g, q, p)
-    # memoize
-    if r <= 0:
-        raise AssertionError(r)
-    cache[abs(u)] = r
+        cache[node] = r
+    node = abs(u)
+    # terminal ?
+    if node == 1:
+        return u
+    r = cache[node]
     # complement ?
     if u < 0:
         r = -r
@@ -3236,17 +4249,25 @@ def to_nx(
     """
     _nx = _utils.import_module('networkx')
     g = _nx.MultiDiGraph()
+    succ = bdd._succ
+    add_node = g.add_node
+    add_edge = g.add_edge
+    # breadth-first search,
+    # with nodes visited once over all roots
+    visited = set()
     for root in roots:
         if abs(root) not in bdd:
             raise ValueError(root)
-        Q = {root}
-        while Q:
-            u = Q.pop()
-            u = abs(u)
-            i, v, w = bdd._succ[u]
+        queue = _cl.deque([abs(root)])
+        while queue:
+            u = queue.popleft()
+            if u in visited:
+                continue
+            visited.add(u)
+            i, v, w = succ[u]
             if u <= 0:
                 raise AssertionError(u)
-            g.add_node(u, level=i)
+            add_node(u, level=i)
             # terminal ?
             if v is None or w is None:
                 if v is not None:
@@ -3258,19 +4279,19 @@ def to_nx(
             r = (v < 0)
             v = abs(v)
             w = abs(w)
-            if v not in g:
-                Q.add(v)
-            if w not in g:
-                Q.add(w)
+            if v not in visited:
+                queue.append(v)
+            if w not in visited:
+                queue.append(w)
             if v <= 0:
                 raise AssertionError(v)
             if w <= 0:
                 raise AssertionError(w)
-            g.add_edge(
+            add_edge(
                 u, v,
                 value=False,
                 complement=r)
-            g.add_edge(
+            add_edge(
                 u, w,
                 value=True,
                 complement=False)
@@ -3296,17 +4317,19 @@ def _to_dot(
     The roots are plotted as external references,
     with complemented edges where applicable.
     """
+    succ = bdd._succ
     # all nodes ?
+    # (as positive integers)
     if roots is None:
-        nodes = bdd._succ
+        nodes = succ
         roots = list()
     else:
         nodes = bdd.descendants(roots)
     # show only levels in aggregate support
     levels = {
-        bdd._succ[abs(u)][0]
+        succ[u][0]
         for u in nodes}
-    if bdd._succ[1][0] not in levels:
+    if succ[1][0] not in levels:
         raise AssertionError(
             'level of node 1 is missing from computed '
             'set of BDD nodes reachable from `roots`')
@@ -3342,43 +4365,42 @@ def _to_dot(
             u, v,
             style='invis')
     # add nodes
-    idx2var = {
-        k: v
-        for v, k in bdd.vars.items()}
+    # (`_level_to_var` is maintained by
+    # `add_var()` and `swap()`)
+    idx2var = bdd._level_to_var
     # BDD nodes
-    def f(x):
-        return str(abs(x))
     for u in nodes:
-        i, v, w = bdd._succ[abs(u)]
+        i, v, w = succ[u]
+        su = str(u)
         # terminal ?
         if v is None:
-            var = str(bool(abs(u)))
+            label = f'True-{su}'
         else:
-            var = idx2var[i]
-        su = f(u)
-        label = f'{var}-{su}'
+            label = f'{idx2var[i]}-{su}'
         # add node to subgraph for level i
-        h = subgraphs[i]
-        h.add_node(
+        subgraphs[i].add_node(
             su,
             label=label)
         # add edges
         if v is None:
             continue
-        sv = f(v)
-        sw = f(w)
-        kw = dict(style='dashed')
+        # `w > 0`
+        sv = str(abs(v))
+        sw = str(w)
         if v < 0:
-            kw['taillabel'] = '-1'
-        g.add_edge(
-            su, sv,
-            **kw)
+            g.add_edge(
+                su, sv,
+                style='dashed',
+                taillabel='-1')
+        else:
+            g.add_edge(
+                su, sv,
+                style='dashed')
         g.add_edge(
             su, sw,
             style='solid')
     # external references to BDD nodes
     for u in roots:
-        i, _, _ = bdd._succ[abs(u)]
         su = f'"ref{u}"'
         label = f'@{u}'
         # add node to subgraph for level -1
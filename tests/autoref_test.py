@@ -118,6 +118,17 @@ def test_preimage():
     assert u == u_
 
 
+def test_and_exists():
+    bdd = _bdd.BDD()
+    bdd.declare('x', 'y')
+    u = bdd.add_expr('x => y')
+    v = bdd.add_expr('x')
+    r = _bdd.and_exists(u, v, {'x'})
+    assert r == bdd.add_expr('y'), r
+    r = _bdd.or_forall(u, ~ v, {'x'})
+    assert r == bdd.add_expr('y'), r
+
+
 def test_reorder_2():
     bdd = _bdd.BDD()
     vrs = [
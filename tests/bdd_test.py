@@ -3,6 +3,7 @@
 #
 import logging
 import os
+import pickle
 
 import dd.autoref
 import dd.bdd as _bdd
@@ -133,6 +134,27 @@ def test_var_levels_attr():
     assert {0, 1} == set(var_levels.values()), var_levels
 
 
+def test_levels():
+    ordering = dict(x=0, y=1, z=2)
+    b = BDD(ordering)
+    u = b.add_expr(r'x /\ y')
+    v = b.add_expr(r'y \/ z')
+    t = list(b.levels())
+    # from terminals to root
+    levels = [i for _, i, _, _ in t]
+    assert levels == sorted(levels, reverse=True), levels
+    assert levels[0] == 3, levels
+    nodes = {r for r, _, _, _ in t}
+    assert nodes == set(b._succ), (nodes, b._succ)
+    for r, i, p, q in t:
+        assert b._succ[r] == (i, p, q), (r, b._succ)
+    assert abs(u) in nodes, nodes
+    assert abs(v) in nodes, nodes
+    t = list(b.levels(skip_terminals=True))
+    nodes = {r for r, _, _, _ in t}
+    assert nodes == set(b._succ).difference({1}), nodes
+
+
 def test_descendants():
     ordering = dict(x=0, y=1)
     b = BDD(ordering)
@@ -189,6 +211,15 @@ def test_is_essential():
     assert not g.is_essential(1, 'y')
     # variable not in the ordering
     assert not g.is_essential(2, 'z')
+    # exponentially many paths
+    g = BDD()
+    n = 40
+    names = [f'x{i}' for i in range(n)]
+    g.declare(*names, 'y')
+    expr = ' ^ '.join(names)
+    u = g.add_expr(expr)
+    assert g.is_essential(u, f'x{n - 1}')
+    assert not g.is_essential(u, 'y')
 
 
 def test_support():
@@ -201,6 +232,14 @@ def test_support():
     g = x_or_y()
     assert g.support(4) == {'x', 'y'}
     assert g.support(3) == {'y'}
+    # memoized
+    memo = g._memo_tables[('support',)]
+    assert memo == {4: {0, 1}, 3: {1}}, memo
+    levels = g.support(4, as_levels=True)
+    levels.add(2)
+    assert g.support(4, as_levels=True) == {0, 1}
+    assert g.is_essential(-4, 'x')
+    assert not g.is_essential(3, 'x')
 
 
 def test_count():
@@ -229,6 +268,14 @@ def test_count():
     u = g.add_expr(r'x /\ y ')
     r = g.count(u)
     assert r == 1, r
+    # deeper than the recursion limit
+    n = 3000
+    g = BDD()
+    u = _chain(g, n)
+    r = g.count(u)
+    assert r == 1, r
+    r = g.count(-u)
+    assert r == 2**n - 1, r
 
 
 def test_pick_iter():
@@ -512,6 +559,51 @@ def test_find_or_add():
     _, v, w = g._succ[abs(u)]
     assert v > 0, v
     assert w > 0, w
+    # full
+    g = BDD()
+    g.declare(*(f'x{i}' for i in range(10)))
+    g.max_nodes = 5
+    with pytest.raises(RuntimeError):
+        g.add_expr(r' /\ '.join(g.vars))
+
+
+def test_find_or_add_many():
+    ordering = {'x': 0, 'y': 1}
+    g = BDD(ordering)
+    h = BDD(ordering)
+    y = h.find_or_add(1, -1, 1)
+    pairs = [(-1, 1), (1, -1), (-1, -1), (-1, 1)]
+    nodes = g._find_or_add_many(1, pairs)
+    expected = [h.find_or_add(1, v, w) for v, w in pairs]
+    assert nodes == expected, (nodes, expected)
+    assert nodes[0] == y, nodes
+    assert nodes[1] == -y, nodes
+    assert nodes[2] == -1, nodes
+    assert g._succ == h._succ, (g._succ, h._succ)
+    assert g._ref == h._ref, (g._ref, h._ref)
+    assert g._min_free == h._min_free
+    # edges into the new level
+    pairs = [(y, 1), (-y, y)]
+    nodes = g._find_or_add_many(0, pairs)
+    expected = [h.find_or_add(0, v, w) for v, w in pairs]
+    assert nodes == expected, (nodes, expected)
+    assert g._ref == h._ref, (g._ref, h._ref)
+    g.assert_consistent()
+    # only non-terminals can be added
+    with pytest.raises(ValueError):
+        g._find_or_add_many(2, [(-1, 1)])
+    # low and high must already exist
+    with pytest.raises(ValueError):
+        g._find_or_add_many(0, [(30, 40)])
+    # full
+    g = BDD(ordering)
+    g.max_nodes = 4
+    y, _ = g._find_or_add_many(1, [(-1, 1), (1, -1)])
+    with pytest.raises(RuntimeError):
+        g._find_or_add_many(0, [(y, 1), (-y, y)])
+    # no node was added
+    assert len(g) == 2, len(g)
+    g.assert_consistent()
 
 
 def test_next_free_int():
@@ -534,6 +626,22 @@ def test_next_free_int():
     assert n == 2, n
     n = g._next_free_int(start=3)
     assert n == 4, n
+    # integers freed by garbage collection
+    g._succ = {1, 2, 3, 5, 6}
+    g._free_nodes = [4, 7]
+    n = g._next_free_int(start=3)
+    assert n == 4, n
+    g._succ.add(4)
+    n = g._next_free_int(start=4)
+    assert n == 7, n
+    assert g._free_nodes == [7], g._free_nodes
+    # freed integers at or above `max_nodes`
+    max_nodes = g.max_nodes
+    g.max_nodes = 7
+    with pytest.raises(RuntimeError):
+        g._next_free_int(start=7)
+    g.max_nodes = max_nodes
+    g._free_nodes = list()
     # full
     g._succ = {1, 2, 3}
     g.max_nodes = 3
@@ -565,6 +673,8 @@ def test_collect_garbage():
     assert n == 1, n
     assert u not in g, g._succ
     assert w not in g, g._succ
+    free = sorted(g._free_nodes)
+    assert free == [2, 3, 4], free
     # some nodes not garbage
     # projection of x is garbage
     g = BDD({'x': 0, 'y': 1})
@@ -577,6 +687,28 @@ def test_collect_garbage():
     g.collect_garbage()
     n = len(g)
     assert n == 3, n
+    # nothing freed, so cached results are kept
+    g.add_expr(r'x \/ y')
+    table = dict(g._ite_table)
+    assert table, table
+    g.collect_garbage([u])
+    assert g._ite_table == table, g._ite_table
+    g.collect_garbage()
+    assert not g._ite_table, g._ite_table
+    # results among remaining nodes are kept
+    g = BDD({'x': 0, 'y': 1, 'z': 2})
+    x = g.var('x')
+    y = g.var('y')
+    u = g.ite(x, y, -1)
+    for r in (x, y, u):
+        g.incref(r)
+    g.add_expr(r'x /\ z')
+    assert len(g._ite_table) == 2, g._ite_table
+    g.collect_garbage()
+    entries = list(g._ite_table.values())
+    assert entries == [((x, y, -1), u)], entries
+    for r in (x, y, u):
+        g.decref(r)
 
 
 def test_top_cofactor():
@@ -616,6 +748,111 @@ def test_ite():
     # negation
     assert g.ite(x, -1, 1) == -x, g._succ
     assert g.ite(-x, -1, 1) == x, g._succ
+    # trivial cases are not cached
+    g._ite_table = dict()
+    assert g.ite(x, y, y) == y
+    assert g.ite(u, 1, -1) == u
+    assert g.ite(u, -1, 1) == -u
+    assert not g._ite_table, g._ite_table
+
+
+def test_ite_deep():
+    # deeper than the recursion limit
+    n = 3000
+    g = BDD()
+    u = _chain(g, n)
+    v = _chain(g, n - 1)
+    # `u` implies `v`
+    r = g.ite(u, v, -1)
+    assert r == u, r
+    r = g.ite(v, 1, u)
+    assert r == v, r
+    r = g.ite(-u, -1, v)
+    assert r == u, r
+    # same as recursion
+    g = BDD()
+    g.declare('x', 'y', 'z')
+    u = g.add_expr(r'x /\ ~ y')
+    v = g.add_expr(r'y \/ z')
+    r = g._ite_iterative(u, v, -v)
+    g._ite_table = dict()
+    assert r == g._ite(u, v, -v), r
+    r = g._ite_iterative(-u, 1, v)
+    g._ite_table = dict()
+    assert r == g._ite(-u, 1, v), r
+    # branches equal to the condition
+    x = g.var('x')
+    y = g.var('y')
+    cases = [
+        ((x, x, y), r'x \/ y'),
+        ((x, -x, y), r'~ x /\ y'),
+        ((x, y, x), r'x /\ y'),
+        ((x, y, -x), r'x => y'),
+        ((x, x, -x), 'TRUE'),
+        ((x, -x, x), 'FALSE')]
+    for (a, b, c), expr in cases:
+        r_ = g.add_expr(expr)
+        g._ite_table = dict()
+        r = g._ite(a, b, c)
+        assert r == r_, (r, r_)
+        g._ite_table = dict()
+        r = g._ite_iterative(a, b, c)
+        assert r == r_, (r, r_)
+
+
+def test_and():
+    g = BDD()
+    g.declare('x', 'y', 'z', 'w')
+    exprs = [
+        'TRUE', 'FALSE', 'x', 'z',
+        r'x /\ ~ y', r'y \/ z',
+        r'x <=> w', r'~ x \/ (y ^ z)']
+    nodes = [g.add_expr(e) for e in exprs]
+    for u in nodes:
+        for v in nodes:
+            # same as `ite`
+            r = g._and(u, v)
+            assert r == g.ite(u, v, -1), (u, v)
+            assert r == g._and(v, u), (u, v)
+            r = g.apply('or', u, v)
+            assert r == g.ite(u, 1, v), (u, v)
+            r = g.apply('=>', u, v)
+            assert r == g.ite(u, v, 1), (u, v)
+            r = g.apply('-', u, v)
+            assert r == g.ite(u, -v, -1), (u, v)
+    # deeper than the recursion limit
+    n = 3000
+    g = BDD()
+    u = _chain(g, n)
+    v = g.find_or_add(n - 1, -1, 1)
+    r = g.apply('and', u, v)
+    assert r == u, r
+    r = g.apply('or', u, v)
+    assert r == v, r
+    r = g.apply('=>', u, v)
+    assert r == 1, r
+
+
+def test_ite_cache_size():
+    g = BDD()
+    g.declare('x', 'y', 'z')
+    cfg = g.configure()
+    assert cfg['max_cache_hard'] == _bdd.MAX_CACHE_HARD, cfg
+    g.configure(max_cache_hard=3)
+    cfg = g.configure()
+    assert cfg['max_cache_hard'] == 4, cfg
+    # overwriting entries does not change results
+    g.configure(max_cache_hard=1)
+    u = g.add_expr(r'(x /\ y) \/ (~ x /\ z)')
+    v = g.add_expr(r'(x => y) /\ (~ x => z)')
+    assert u == v, (u, v)
+    assert len(g._ite_table) <= 1, g._ite_table
+    with pytest.raises(ValueError):
+        g.configure(max_cache_hard=0)
+    # copies keep the cache size
+    h = g.__copy__()
+    cfg = h.configure()
+    assert cfg['max_cache_hard'] == 1, cfg
 
 
 def test_add_expr():
@@ -728,6 +965,51 @@ def test_cofactor():
     assert g.let({'x': True}, -e) == -y
     assert g.let({'y': False}, -e) == 1
     assert g.let({'y': True}, -e) == -x
+    # assignment to all variables
+    values = dict(x=True, y=True, z=False)
+    assert g.let(values, e) == 1
+    assert g.let(values, -e) == -1
+    values = dict(x=True, y=False, z=True)
+    assert g.let(values, e) == -1
+    assert g.let(values, -e) == 1
+    # descent stops at an unassigned variable
+    u = g.add_expr(r'x /\ (y \/ z)')
+    v = g.add_expr(r'y \/ z')
+    assert g.let({'x': True, 'z': False}, u) == y
+    assert g.let({'x': True}, u) == v
+    assert g.let({'x': True}, -u) == -v
+
+
+def test_cofactor_deep():
+    # deeper than the recursion limit
+    n = 3000
+    g = BDD()
+    u = _chain(g, n)
+    v = _chain(g, n - 1)
+    last = f'x{n - 1}'
+    assert g.let({last: True}, u) == v
+    assert g.let({last: False}, u) == -1
+    assert g.let({last: True}, -u) == -v
+    # abstraction and substitution
+    assert g.exist([last], u) == v
+    assert g.forall([last], -u) == -v
+    assert g.let({last: g.true}, u) == v
+    r = g.let({last: g.true, 'x0': g.true}, u)
+    assert r == g.let({'x0': True}, v), r
+
+
+def test_cube():
+    g = BDD()
+    g.declare('x', 'y', 'z')
+    u = g.cube(dict(z=True, x=False))
+    assert u == g.add_expr(r'~ x /\ z'), u
+    u = g.cube(['y', 'x'])
+    assert u == g.add_expr(r'x /\ y'), u
+    u = g.cube(dict(y=False))
+    assert u == g.add_expr('~ y'), u
+    assert g.cube(dict()) == g.true
+    with pytest.raises(ValueError):
+        g.cube(dict(w=True))
 
 
 def test_swap():
@@ -743,6 +1025,7 @@ def test_swap():
     assert n == 3, n
     assert nold == n, nold
     assert g.vars == {'y': 0, 'x': 1}, g.vars
+    assert g._level_to_var == {0: 'y', 1: 'x'}, g._level_to_var
     g.assert_consistent()
     # functions remain invariant
     x_ = g.add_expr('x')
@@ -828,11 +1111,45 @@ def test_sifting():
     _bdd.reorder(g)
     n_ = len(g)
     assert n > n_, (n, n_)
+    # interleaved order
+    assert n_ == 7, n_
     u_ = g.add_expr(r'(z1 /\ y1) \/ (z2 /\ y2) \/ (z3 /\ y3)')
     g.incref(u)
     g.collect_garbage()
     g.assert_consistent()
     assert u == u_, (u, u_)
+    # shifting stops above the limit
+    var = g.var_at_level(0)
+    levels = g._levels()
+    sizes = _bdd._shift(g, 0, 5, levels, limit=0)
+    assert sizes == {0: n_, 1: len(g)}, sizes
+    assert g.level_of_var(var) == 1, g.vars
+    g.assert_consistent()
+
+
+def test_sort_to_order():
+    g = BDD({'x': 0, 'y': 1, 'z': 2, 'w': 3})
+    u = g.add_expr(r'(x /\ ~ z) \/ (y <=> w)')
+    g.incref(u)
+    g.roots.add(u)
+    order = {'w': 0, 'z': 1, 'x': 2, 'y': 3}
+    swaps = list()
+    swap = g.swap
+    def count_swap(*arg):
+        swaps.append(arg[:2])
+        return swap(*arg)
+    g.swap = count_swap
+    _bdd.reorder(g, order)
+    assert g.vars == order, g.vars
+    # number of inversions
+    assert len(swaps) == 5, swaps
+    u_ = g.add_expr(r'(x /\ ~ z) \/ (y <=> w)')
+    assert u_ == u, (u, u_)
+    g.assert_consistent()
+    # already in order
+    swaps.clear()
+    _bdd.reorder(g, order)
+    assert not swaps, swaps
 
 
 def test_request_reordering():
@@ -1037,6 +1354,20 @@ def test_dump_load():
     b.assert_consistent()
 
 
+def test_dump_load_deep():
+    # deeper than the recursion limit
+    n = 3000
+    g = BDD()
+    u = _chain(g, n)
+    fname = 'test_dump_load_deep.p'
+    g.dump(fname, [-u])
+    h = BDD()
+    (u_,) = h.load(fname)
+    assert len(h) == len(g), (len(h), len(g))
+    assert h.count(u_) == 2**n - 1
+    h.assert_consistent()
+
+
 def test_dump_load_manager():
     prefix = 'test_dump_load_manager'
     g = BDD({'x': 0, 'y': 1})
@@ -1045,8 +1376,15 @@ def test_dump_load_manager():
     g.incref(u)
     fname = f'{prefix}.p'
     g._dump_manager(fname)
+    # readable by earlier versions
+    with open(fname, 'rb') as f:
+        d = pickle.load(f)
+    assert d['pred'] == g._pred, d
     h = g._load_manager(fname)
     g.assert_consistent()
+    # `_pred` is rebuilt from `_succ`
+    assert h._pred == g._pred, (h._pred, g._pred)
+    h.assert_consistent()
     u_ = h.add_expr(e)
     assert u == u_, (u, u_)
     # h.dump(f'{prefix}.pdf')
@@ -1107,6 +1445,108 @@ def test_quantify():
     assert r == x, r
 
 
+def test_canon_levels():
+    g = BDD()
+    g.declare('x', 'y', 'z')
+    levels, ordvar = g._canon_levels({'z', 'x'})
+    assert levels == {0, 2}, levels
+    assert ordvar == [0, 2], ordvar
+    r = g._canon_levels(['x', 'z'])
+    assert r[0] is levels, r
+    values, ordvar = g._canon_levels(dict(y=True, x=False))
+    assert values == {0: False, 1: True}, values
+    assert ordvar == [0, 1], ordvar
+    # swapping invalidates the memo
+    u = g.add_expr(r'x /\ ~ y')
+    g.incref(u)
+    g.swap('x', 'y')
+    levels, ordvar = g._canon_levels({'z', 'x'})
+    assert levels == {1, 2}, levels
+    r = g.quantify(u, {'x'})
+    assert r == g.add_expr('~ y'), r
+
+
+def test_canon_rename():
+    g = BDD()
+    g.declare('x', 'y', 'z')
+    d, frozen = g._canon_rename(dict(x='y'))
+    assert d == {0: 1}, d
+    assert frozen == frozenset({(0, 1)}), frozen
+    r = g._canon_rename(dict(x='y'))
+    assert r[0] is d, r
+    # levels
+    d, _ = g._canon_rename({0: 2})
+    assert d == {0: 2}, d
+    # total
+    d, _ = g._canon_rename(dict(x='y'), total=True)
+    assert d == {0: 1, 1: 1, 2: 2}, d
+    # swapping invalidates the memo
+    g.swap('x', 'y')
+    d, _ = g._canon_rename(dict(x='y'))
+    assert d == {1: 0}, d
+
+
+def test_memo_table():
+    g = BDD()
+    g.declare('x', 'y', 'z')
+    u = g.add_expr(r'x /\ y')
+    v = g.add_expr(r'y \/ z')
+    g.incref(u)
+    g.incref(v)
+    r = _bdd.and_exists(u, v, {'y'}, g)
+    assert r == g.add_expr('x'), r
+    assert len(g._memo_tables) == 1, g._memo_tables
+    (memo,) = g._memo_tables.values()
+    assert memo, memo
+    # reused by repeated calls
+    r_ = _bdd.and_exists(u, v, ['y'], g)
+    assert r_ == r, (r_, r)
+    assert g._memo_tables == {
+        ('and_exists', frozenset({1})): memo}, g._memo_tables
+    # keyed by operation
+    r = _bdd.and_exists(u, v, {'x'}, g)
+    assert r == g.add_expr(r'y'), r
+    assert len(g._memo_tables) == 2, g._memo_tables
+    # removal of nodes invalidates memos
+    g.collect_garbage()
+    assert not g._memo_tables, g._memo_tables
+    r = _bdd.and_exists(u, v, {'y'}, g)
+    assert r == g.add_expr('x'), r
+    g.swap('x', 'y')
+    assert not g._memo_tables, g._memo_tables
+    r = _bdd.and_exists(u, v, {'y'}, g)
+    assert r == g.add_expr('x'), r
+    # cofactors and abstractions
+    r = g.quantify(u, {'x'})
+    assert r == g.add_expr('y'), r
+    key = ('quantify', frozenset({g.level_of_var('x')}), False)
+    assert key in g._memo_tables, g._memo_tables
+    r = g.let(dict(y=True), u)
+    assert r == g.add_expr('x'), r
+    key = ('cofactor', frozenset({(g.level_of_var('y'), True)}))
+    assert key in g._memo_tables, g._memo_tables
+    # least recently used memos are removed
+    g._memo_tables = {
+        ('dummy', i): dict()
+        for i in range(_bdd._MAX_MEMO_TABLES)}
+    memo = g._memo_table(('dummy', 0))
+    g._memo_table(('dummy', -1))
+    assert len(g._memo_tables) == _bdd._MAX_MEMO_TABLES
+    assert g._memo_tables[('dummy', 0)] is memo
+    # bound on the entries in all memos
+    g.configure(max_cache_hard=8)
+    g._memo_tables = {
+        ('dummy', i): dict.fromkeys(range(3))
+        for i in range(3)}
+    memo = g._memo_table(('dummy', 0))
+    g._memo_table(('dummy', -1))
+    assert list(g._memo_tables) == [
+        ('dummy', 2), ('dummy', 0), ('dummy', -1)], g._memo_tables
+    assert g._memo_tables[('dummy', 0)] is memo
+    assert ('dummy', 1) not in g._memo_tables
+    assert ('dummy', -1) in g._memo_tables
+
+
 def test_quantifier_syntax():
     b = BDD()
     [b.add_var(var) for var in ['x', 'y']]
@@ -1175,6 +1615,22 @@ def test_rename():
     dvars = {'x': 'x'}
     v = g.let(dvars, u)
     assert v == u, (v, u)
+    # nodes below renamed levels are unchanged
+    w = g.add_expr(r'y /\ ~ z')
+    dvars = {'x': 'xp'}
+    r = g.let(dvars, u)
+    r_ = g.add_expr(r'xp /\ y /\ ~ z')
+    assert r == r_, (r, r_)
+    memo = g._memo_tables[
+        ('rename', frozenset({
+            (0, 1), (1, 1), (2, 2),
+            (3, 3), (4, 4), (5, 5)}))]
+    assert memo[abs(w)] == abs(w), memo
+    # constants are unchanged
+    n = len(g._memo_tables)
+    r = _bdd.rename(g.false, g, dvars)
+    assert r == g.false, r
+    assert len(g._memo_tables) == n, g._memo_tables
 
 
 def test_rename_syntax():
@@ -1217,6 +1673,11 @@ def test_image_rename_map_checks():
     assert r == 1, r
     # overlapping keys and values
     rename = {0: 1, 1: 2}
+    with pytest.raises(AssertionError):
+        _bdd.image(1, 1, rename, qvars, bdd)
+    with pytest.raises(AssertionError):
+        _bdd.preimage(1, 1, rename, qvars, bdd)
+    # checked again when repeated
     with pytest.raises(AssertionError):
         _bdd.image(1, 1, rename, qvars, bdd)
     with pytest.raises(AssertionError):
@@ -1237,6 +1698,36 @@ def test_image_rename_map_checks():
     assert r == bdd.var('y'), r
 
 
+def test_image_rename_before_declare():
+    g = BDD()
+    g.declare('x')
+    u = g.add_expr('x')
+    # `xp` undeclared
+    with pytest.raises(TypeError):
+        _bdd.image(u, u, {'xp': 'x'}, {'x'}, g)
+    with pytest.raises(TypeError):
+        _bdd.preimage(u, u, {'x': 'xp'}, set(), g)
+    g.declare('xp')
+    r = _bdd.image(u, u, {'xp': 'x'}, {'x'}, g)
+    assert r == g.true, r
+    r = _bdd.preimage(u, u, {'x': 'xp'}, set(), g)
+    assert r == g.add_expr(r'x /\ xp'), r
+
+
+def test_find_level_in_support():
+    g = BDD()
+    g.declare('x', 'y', 'z')
+    u = g.add_expr(r'x /\ z')
+    v = g.add_expr('~ y')
+    find = _bdd._find_level_in_support
+    assert find([u], {1}, g) is None
+    assert find([u, v], {1}, g) == 1
+    assert find([-u], {2}, g) == 2
+    assert find([u], {0, 2}, g) in {0, 2}
+    assert find([u, v], set(), g) is None
+    assert find([g.true], {0}, g) is None
+
+
 def test_preimage():
     # exists: x, y
     # forall: z
@@ -1297,6 +1788,85 @@ def test_preimage():
     assert p == g.add_expr(r'x /\ y')
 
 
+def test_and_exists():
+    g = BDD()
+    g.declare('x', 'y', 'z')
+    u = g.add_expr(r'x => y')
+    v = g.add_expr(r'x /\ z')
+    r = _bdd.and_exists(u, v, {'x'}, g)
+    r_ = g.add_expr(r'\E x:  (x => y) /\ x /\ z')
+    assert r == r_, (r, r_)
+    assert r == g.add_expr(r'y /\ z'), r
+    r = _bdd.and_exists(u, v, {'x', 'y', 'z'}, g)
+    assert r == g.true, r
+    r = _bdd.and_exists(u, -u, {'x'}, g)
+    assert r == g.false, r
+    # no quantified variables
+    r = _bdd.and_exists(u, v, set(), g)
+    assert r == g.apply('and', u, v), r
+    # `TRUE` for the low cofactors
+    # skips the high cofactors
+    g = BDD()
+    g.declare('x', 'y')
+    u = g.add_expr(r'~ x \/ y')
+    y = g.add_expr('y')
+    r = _bdd.and_exists(u, 1, {'x'}, g)
+    assert r == g.true, r
+    (memo,) = g._memo_tables.values()
+    assert (y, 1) not in memo, memo
+    r = _bdd.or_forall(-u, -1, {'x'}, g)
+    assert r == g.false, r
+    # `TRUE` conjoined with an operand
+    # below the quantified levels
+    g = BDD()
+    g.declare('x', 'y', 'z')
+    u = g.add_expr(r'x => (y /\ z)')
+    v = g.add_expr(r'y /\ z')
+    r = _bdd.and_exists(u, 1, {'x'}, g)
+    assert r == g.true, r
+    r = _bdd.and_exists(1, u, {'x'}, g)
+    assert r == g.true, r
+    r = _bdd.and_exists(-u, 1, {'x'}, g)
+    assert r == -v, r
+    r = _bdd.and_exists(1, v, {'x'}, g)
+    assert r == v, r
+    r = _bdd.and_exists(v, 1, {'z'}, g)
+    assert r == g.add_expr('y'), r
+    # conjunction with itself
+    r = _bdd.and_exists(v, v, {'x'}, g)
+    assert r == v, r
+    r = _bdd.and_exists(u, u, {'x'}, g)
+    assert r == g.true, r
+    r = _bdd.and_exists(v, -v, set(), g)
+    assert r == g.false, r
+
+
+def test_and_exists_deep():
+    # deeper than the recursion limit
+    n = 3000
+    g = BDD()
+    u = _chain(g, n)
+    # `u` implies `v`
+    v = _chain(g, n - 1)
+    r = _bdd.and_exists(u, v, [], g)
+    assert r == u, r
+    r = _bdd.and_exists(u, v, ['x0'], g)
+    assert r == g._succ[abs(u)][2], r
+
+
+def test_or_forall():
+    g = BDD()
+    g.declare('x', 'y', 'z')
+    u = g.add_expr(r'x /\ y')
+    v = g.add_expr(r'~ x /\ z')
+    r = _bdd.or_forall(u, v, {'x'}, g)
+    r_ = g.add_expr(r'\A x:  (x /\ y) \/ (~ x /\ z)')
+    assert r == r_, (r, r_)
+    assert r == g.add_expr(r'y /\ z'), r
+    r = _bdd.or_forall(u, -u, {'x'}, g)
+    assert r == g.true, r
+
+
 def test_assert_valid_ordering():
     ordering = {'x': 0, 'y': 1}
     _bdd._assert_valid_ordering(ordering)
@@ -1501,6 +2071,20 @@ def assert_valid_succ_pred(u, t, g):
     assert t not in g._pred, g._pred
 
 
+def _chain(g, n):
+    """Return conjunction of `x0, ..., x{n - 1}`.
+
+    Declares the variables in `g` if needed,
+    and expects `x{i}` at level `i`.
+    The node is made bottom-up, without recursion.
+    """
+    g.declare(*(f'x{i}' for i in range(n)))
+    u = 1
+    for i in range(n - 1, -1, -1):
+        u = g.find_or_add(i, -1, u)
+    return u
+
+
 def ref_var(i):
     h = nx.MultiDiGraph()
     h.add_node(1, level=2)